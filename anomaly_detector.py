@@ -0,0 +1,262 @@
+import time
+import math
+import argparse
+import threading
+import logging
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional
+from config import (
+    ANOMALY_EWMA_ALPHA,
+    ANOMALY_Z_THRESHOLD,
+    ANOMALY_MIN_OBSERVATIONS,
+    ANOMALY_MAX_SEEN_ARTICLES,
+    ANOMALY_MAX_ALERTS,
+    ANOMALY_MIN_INTERVAL_SECONDS,
+)
+
+# Set up a logger
+logger = logging.getLogger('anomaly_detector')
+
+class EwmaStats:
+    def __init__(self, alpha: float):
+        """Exponentially weighted running mean and variance, O(1) per update"""
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def z_score(self, value: float) -> Optional[float]:
+        """Z-score of a value against the current statistics (None until the variance is known)"""
+        # A constant series leaves only rounding error in the variance
+        if self.count < 2 or self.var <= 1e-12 * max(1.0, self.mean * self.mean):
+            return None
+        return (value - self.mean) / math.sqrt(self.var)
+
+    def update(self, value: float):
+        """Fold a new observation into the statistics"""
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.count += 1
+
+class TickerState:
+    def __init__(self, alpha: float):
+        """Running statistics and seen articles for one ticker"""
+        self.sentiment = EwmaStats(alpha)
+        self.mentions = EwmaStats(alpha)
+        self.seen = OrderedDict()
+        self.last_update = None  # Unix time of the last update used for the statistics
+
+class SentimentAnomalyDetector:
+    def __init__(
+        self,
+        engine=None,
+        alpha: float = ANOMALY_EWMA_ALPHA,
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+        min_observations: int = ANOMALY_MIN_OBSERVATIONS,
+        max_seen_articles: int = ANOMALY_MAX_SEEN_ARTICLES,
+        max_alerts: int = ANOMALY_MAX_ALERTS,
+        min_interval: float = ANOMALY_MIN_INTERVAL_SECONDS,
+    ):
+        """
+        Initialize an incremental detector of sentiment and mention-volume spikes
+
+        Each update only scores the articles not seen before, so the cost scales
+        with new articles rather than with history length.
+
+        Args:
+            engine: SentimentEngine used to score new articles (created on first use)
+            alpha: EWMA weight of the newest observation
+            z_threshold: Absolute z-score above which an observation is an anomaly
+            min_observations: Observations needed before a ticker can alert
+            max_seen_articles: Article ids remembered per ticker for deduplication
+            max_alerts: Alerts kept in memory
+            min_interval: Seconds an update must be after the previous one to count
+        """
+        self.engine = engine
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_observations = min_observations
+        self.max_seen_articles = max_seen_articles
+        self.min_interval = min_interval
+        self.alerts = deque(maxlen=max_alerts)
+        self._states: Dict[str, TickerState] = {}
+        self._lock = threading.Lock()
+
+    def _article_id(self, item: Dict[str, Any]) -> Any:
+        """Identify a news item (Finnhub id, or publication time and headline)"""
+        return item.get('id') or (item.get('datetime'), item.get('headline'))
+
+    def update(self, ticker: str, news_items: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Fold a ticker's freshly fetched news into its running statistics
+
+        The first update for a ticker only records the articles as seen. Later
+        updates compare the mean score of the articles not seen before, and the
+        rate (articles per hour) of articles published since the previous update,
+        against the ticker's EWMA statistics. Updates less than min_interval
+        after the previous one are ignored, so their articles count towards the
+        next one; pass only actually fetched responses, never cache hits.
+
+        Args:
+            ticker: Stock symbol
+            news_items: Latest news for the ticker (from FinnhubClient.get_news())
+            now: Current Unix time (defaults to time.time())
+
+        Returns:
+            List of new alert dictionaries
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            state = self._states.get(ticker)
+            first_update = state is None
+            if first_update:
+                state = self._states[ticker] = TickerState(self.alpha)
+            elif now - state.last_update < self.min_interval:
+                return []
+
+            new_items = []
+            for item in news_items:
+                article_id = self._article_id(item)
+                if article_id in state.seen:
+                    continue
+                state.seen[article_id] = True
+                new_items.append(item)
+            while len(state.seen) > self.max_seen_articles:
+                state.seen.popitem(last=False)
+
+            previous_update = state.last_update
+            state.last_update = now
+            if first_update:
+                return []
+
+            alerts = []
+            if new_items:
+                if self.engine is None:
+                    from sentiment_engine import SentimentEngine
+                    self.engine = SentimentEngine()
+                scores = [self.engine.score_article(item) for item in new_items]
+                mean_score = sum(scores) / len(scores)
+                alerts += self._observe(ticker, 'sentiment_score', state.sentiment, mean_score, now)
+
+            # Count by publication time, so the rate does not depend on how often news is polled
+            published = sum(1 for item in news_items if previous_update < (item.get('datetime') or 0) <= now)
+            mention_rate = published / ((now - previous_update) / 3600)
+            alerts += self._observe(ticker, 'mentions', state.mentions, mention_rate, now)
+
+            self.alerts.extend(alerts)
+
+        for alert in alerts:
+            logger.warning(
+                f"Anomaly in {alert['ticker']} {alert['metric']}: {alert['value']:.3f} "
+                f"(mean {alert['mean']:.3f}, z={alert['z_score']:.1f})"
+            )
+        return alerts
+
+    def _observe(self, ticker: str, metric: str, stats: EwmaStats, value: float, now: float) -> List[Dict[str, Any]]:
+        """Check one observation against its statistics, then fold it in"""
+        z_score = stats.z_score(value)
+        alerts = []
+        if (
+            z_score is not None
+            and stats.count >= self.min_observations
+            and abs(z_score) >= self.z_threshold
+            # Only a rise in mention volume is interesting
+            and (metric != 'mentions' or z_score > 0)
+        ):
+            alerts.append({
+                'ticker': ticker,
+                'metric': metric,
+                'value': value,
+                'mean': stats.mean,
+                'z_score': z_score,
+                'timestamp': now,
+            })
+        stats.update(value)
+        return alerts
+
+    def update_batch(self, batch_data: Dict[str, Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Update the detector with batch data from FinnhubClient.get_batch_data()
+
+        Args:
+            batch_data: Dictionary of ticker data
+            now: Current Unix time (defaults to time.time())
+
+        Returns:
+            List of new alert dictionaries
+        """
+        alerts = []
+        for ticker, data in batch_data.items():
+            alerts += self.update(ticker, data.get('news', []), now)
+        return alerts
+
+    def watch(self, cache):
+        """
+        Update the detector with every news response a TickerCache fetches
+
+        Cache hits never reach the detector, so each update reflects an actual poll.
+
+        Args:
+            cache: TickerCache to subscribe to
+        """
+        def on_fetch(endpoint, ticker, params, response):
+            if endpoint == 'news':
+                self.update(ticker, response or [])
+
+        cache.subscribe(on_fetch)
+
+    def recent_alerts(self, tickers: Optional[List[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get the most recent alerts, newest first
+
+        Args:
+            tickers: Only return alerts for these tickers (None for all)
+            limit: Maximum number of alerts
+
+        Returns:
+            List of alert dictionaries
+        """
+        with self._lock:
+            alerts = [a for a in reversed(self.alerts) if tickers is None or a['ticker'] in tickers]
+        return alerts[:limit]
+
+# Process-wide detector shared by every dashboard session
+shared_detector = SentimentAnomalyDetector()
+
+def main():
+    """Poll news for a set of tickers and print sentiment anomalies as they occur"""
+    from finnhub_client import FinnhubClient
+    from refresh_scheduler import RefreshScheduler
+    from config import DEFAULT_STOCKS, REFRESH_BUDGET_PER_CYCLE
+
+    parser = argparse.ArgumentParser(description="Watch tickers for sentiment and news volume spikes")
+    parser.add_argument("tickers", nargs="*", default=DEFAULT_STOCKS, help="Stock symbols to watch")
+    parser.add_argument("--interval", type=int, default=300, help="Seconds between polls")
+    parser.add_argument("--days", type=int, default=1, help="News lookback per poll in days")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET_PER_CYCLE, help="Maximum news calls per poll")
+    args = parser.parse_args()
+
+    detector = SentimentAnomalyDetector()
+    # The scheduler polls the tickers most likely to have new articles, within each tier's SLA
+    scheduler = RefreshScheduler(FinnhubClient())
+    for ticker in args.tickers:
+        scheduler.add(ticker.upper())
+
+    while True:
+        for ticker, news_items in scheduler.run_once(args.budget, args.days).items():
+            for alert in detector.update(ticker, news_items):
+                print(
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(alert['timestamp']))} "
+                    f"{alert['ticker']:<6} {alert['metric']:<16} value={alert['value']:.3f} "
+                    f"mean={alert['mean']:.3f} z={alert['z_score']:+.1f}"
+                )
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import gzip
+import json
+import hashlib
+import argparse
+import threading
+import logging
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, Optional, Tuple
+import pandas as pd
+from datetime import datetime
+from config import SNAPSHOT_DIR, LATEST_SNAPSHOT_FILE, API_HOST, API_PORT, API_MAX_CACHED_RESPONSES
+from data_utils import filter_df_by_sector, filter_df_by_sentiment
+
+# Set up a logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('api_server')
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'columns': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+class SnapshotResponder:
+    def __init__(self, directory: str = SNAPSHOT_DIR, max_cached: int = API_MAX_CACHED_RESPONSES):
+        """
+        Serve the latest saved sentiment of every ticker, with rendered bodies cached per query
+
+        The table holds the most recently saved row of each ticker at a fixed
+        lookback (API_LOOKBACK_DAYS), whichever session or job saved it. Bodies
+        are rendered and gzipped once per (table version, filters, format); later
+        requests are answered from memory and never touch the pipeline.
+
+        Args:
+            directory: Directory containing the latest table written by snapshot_store
+            max_cached: Number of rendered responses kept
+        """
+        self.path = os.path.join(directory, LATEST_SNAPSHOT_FILE)
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._snapshot_name = None
+        self._snapshot = None
+        self._responses = OrderedDict()
+
+    def _latest_snapshot(self) -> Tuple[Optional[str], Optional[pd.DataFrame]]:
+        """Get the latest table, rereading it only when it was replaced"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._snapshot = pd.read_csv(self.path)
+            self._snapshot_name = datetime.fromtimestamp(mtime / 1e9).isoformat(timespec='seconds')
+            self._responses.clear()
+            logger.info(f"Serving table saved at {self._snapshot_name}")
+        return self._snapshot_name, self._snapshot
+
+    def _render(self, df: pd.DataFrame, output_format: str) -> bytes:
+        """Render a DataFrame as JSON records, JSON columns or CSV"""
+        if output_format == 'csv':
+            return df.to_csv(index=False).encode('utf-8')
+        if output_format == 'columns':
+            # One array per column; missing values become null
+            columns = df.astype(object).where(df.notna(), None).to_dict(orient='list')
+            return json.dumps(columns).encode('utf-8')
+        return df.to_json(orient='records').encode('utf-8')
+
+    def get(self, sector: str, sentiment: str, output_format: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the response for a query of the latest snapshot
+
+        Args:
+            sector: Sector to filter by ("All" for none)
+            sentiment: Sentiment to filter by ("all" for none)
+            output_format: json, columns or csv
+
+        Returns:
+            Dictionary with etag, snapshot, body, gzip body and its etag, or None if there is no snapshot
+        """
+        with self._lock:
+            snapshot_name, snapshot = self._latest_snapshot()
+            if snapshot is None:
+                return None
+
+            key = (sector, sentiment.lower(), output_format)
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                return response
+
+            df = filter_df_by_sentiment(filter_df_by_sector(snapshot, sector), sentiment)
+            body = self._render(df, output_format)
+            digest = hashlib.sha1(body).hexdigest()[:20]
+            response = {
+                'etag': f'"{digest}"',
+                'snapshot': snapshot_name,
+                'body': body,
+                # The compressed representation has different bytes, so it needs its own strong ETag
+                'gzip_etag': f'"{digest}-gz"',
+                'gzip_body': gzip.compress(body, compresslevel=9),
+            }
+            self._responses[key] = response
+            while len(self._responses) > self.max_cached:
+                self._responses.popitem(last=False)
+            return response
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check whether an Accept-Encoding header allows a gzip response
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate" or "gzip;q=0, identity"
+
+    Returns:
+        True if gzip (or *) is listed with a q-value above zero and gzip is not refused
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    for name in ('gzip', 'x-gzip'):
+        if name in qualities:
+            return qualities[name] > 0
+    return qualities.get('*', 0) > 0
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    responder: SnapshotResponder = None
+
+    def do_GET(self):
+        """Handle GET /snapshot?sector=...&sentiment=...&format=json|columns|csv and GET /health"""
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self._send(200, b'{"status": "ok"}', 'application/json')
+            return
+        if url.path != '/snapshot':
+            self._send(404, b'{"error": "Not found"}', 'application/json')
+            return
+
+        query = parse_qs(url.query)
+        sector = query.get('sector', ['All'])[0]
+        sentiment = query.get('sentiment', ['all'])[0]
+        output_format = query.get('format', ['json'])[0].lower()
+        if output_format not in CONTENT_TYPES:
+            self._send(400, b'{"error": "format must be json, columns or csv"}', 'application/json')
+            return
+
+        try:
+            response = self.responder.get(sector, sentiment, output_format)
+        except Exception as e:
+            logger.error(f"Error serving snapshot: {e}")
+            self._send(500, json.dumps({'error': str(e)}).encode('utf-8'), 'application/json')
+            return
+        if response is None:
+            self._send(503, b'{"error": "No snapshot available yet"}', 'application/json')
+            return
+
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = response['gzip_etag'] if use_gzip else response['etag']
+        headers = {
+            'ETag': etag,
+            'X-Snapshot': response['snapshot'],
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if_none_match = self.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            self._send(304, b'', None, headers)
+            return
+
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+            self._send(200, response['gzip_body'], CONTENT_TYPES[output_format], headers)
+        else:
+            self._send(200, response['body'], CONTENT_TYPES[output_format], headers)
+
+    def _send(self, status: int, body: bytes, content_type: Optional[str], headers: Optional[Dict[str, str]] = None):
+        """Write a complete response"""
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def create_server(host: str = API_HOST, port: int = API_PORT, directory: str = SNAPSHOT_DIR) -> ThreadingHTTPServer:
+    """
+    Create the snapshot API server
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+        directory: Directory containing the latest table
+
+    Returns:
+        ThreadingHTTPServer ready for serve_forever()
+    """
+    handler = type('Handler', (SnapshotRequestHandler,), {'responder': SnapshotResponder(directory)})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main():
+    """Serve the latest saved sentiment of every ticker as a read-only HTTP API"""
+    parser = argparse.ArgumentParser(description="Read-only API serving the latest sentiment snapshot")
+    parser.add_argument("--host", default=API_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Port to listen on")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port)
+    logger.info(f"Serving snapshots on http://{args.host}:{args.port}/snapshot")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 import json
@@ -13,17 +14,39 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger('stock_sentiment_app')
 
 from finnhub_client import FinnhubClient
-from sentiment_engine import SentimentEngine
+from sentiment_engine import SentimentEngine, SentimentBuckets
+from single_flight import shared_flight
+from ticker_cache import shared_cache
+from anomaly_detector import shared_detector
+from correlation_engine import get_shared_correlation_engine
+from snapshot_store import save_snapshot, load_latest_buckets, stale_tickers
+from snapshot_registry import shared_registry
+from symbol_index import get_shared_symbol_index
+from refresh_scheduler import shared_scheduler
 from data_utils import (
     filter_df_by_sector,
     filter_df_by_sentiment,
     sort_df_by_column,
     create_color_scale,
     format_df_for_display,
+    sentiment_score_styles,
+    price_change_styles,
+    DISPLAY_COLUMNS,
     get_sector_counts,
     get_sentiment_stats
 )
-from config import DEFAULT_STOCKS, DEFAULT_TIME_WINDOW, SECTORS
+from config import (
+    DEFAULT_STOCKS,
+    DEFAULT_TIME_WINDOW,
+    MAX_LOOKBACK_DAYS,
+    SECTORS,
+    SNAPSHOT_DIR,
+    CORRELATION_MIN_PERIODS,
+    CORRELATION_LOOKBACK_DAYS,
+    MAX_UNIVERSE_SIZE,
+    REFRESH_BUDGET_PER_CYCLE,
+    WARM_START_POLL_SECONDS
+)
 
 # Page configuration
 st.set_page_config(
@@ -34,53 +57,103 @@ st.set_page_config(
 )
 
 # Create cache directory if it doesn't exist
-if not os.path.exists('./cache'):
-    os.makedirs('./cache')
+os.makedirs(SNAPSHOT_DIR, exist_ok=True)
 
-# Initialize session state
-if 'data' not in st.session_state:
-    st.session_state.data = None
+# Initialize session state. The data lives once per process in the shared snapshot
+# registry; sessions hold a reference to their snapshot, which keeps it from being released.
+if 'snapshot' not in st.session_state:
+    st.session_state.snapshot = None
 if 'last_update' not in st.session_state:
     st.session_state.last_update = None
 if 'lookback_days' not in st.session_state:
     st.session_state.lookback_days = DEFAULT_TIME_WINDOW
+if 'ticker_versions' not in st.session_state:
+    st.session_state.ticker_versions = {}
+if 'loaded_params' not in st.session_state:
+    st.session_state.loaded_params = None
+if 'pending_refresh' not in st.session_state:
+    st.session_state.pending_refresh = None
+
+@st.cache_resource
+def get_refresh_executor():
+    """Thread pool shared by all sessions for background refreshes"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='warm-start-refresh')
+
+@st.cache_resource
+def watch_news_fetches():
+    """Feed every news response fetched in this process (never cache hits) to the anomaly detector and refresh scheduler"""
+    shared_detector.watch(shared_cache)
+    shared_scheduler.watch(shared_cache)
+
+watch_news_fetches()
+
+def build_buckets(tickers):
+    """
+    Fetch MAX_LOOKBACK_DAYS of data from Finnhub API and bucket its sentiment by day
+
+    Responses come from the shared cache where possible, but stale entries are
+    refetched rather than served, so the buckets really are as fresh as their
+    fetched_at says.
+    """
+    # Stale-while-revalidate would hand back the old responses and refresh them
+    # only afterwards; the buckets are saved and stamped as fetched now
+    shared_cache.invalidate(tickers, hard=True, stale_only=True)
+    
+    finnhub_client = FinnhubClient()
+    sentiment_engine = SentimentEngine()
+    
+    # Fetch the full horizon once; any lookback is then answered from the per-day buckets
+    batch_data = finnhub_client.get_batch_data(tickers, MAX_LOOKBACK_DAYS)
+    
+    logger.info(f"Request coalescing: {shared_flight.stats()}")
+    logger.info(f"Response cache: {shared_cache.stats()}")
+    
+    # Day 0 and fetch times follow the transport's clock, so replayed recordings
+    # bucket the same way and never look fresh
+    now = finnhub_client.transport.now()
+    return sentiment_engine.build_daily_buckets(
+        batch_data, MAX_LOOKBACK_DAYS, as_of=now.date(), fetched_at=now.timestamp()
+    )
+
+def fetch_buckets(tickers, days):
+    """
+    Fetch MAX_LOOKBACK_DAYS of data from Finnhub API, bucket its sentiment by day and save a snapshot
 
-# Function to load data
-@st.cache_data(ttl=3600, show_spinner=False)  # Cache for 1 hour
+    Makes no Streamlit calls, so it can also run in a background thread.
+    """
+    buckets = build_buckets(tickers)
+    
+    # Save data to cache
+    snapshot_time = datetime.now()
+    save_snapshot(buckets, days, snapshot_time)
+    
+    # Correlations use one fixed lookback, sampled once per ticker and day
+    correlations = get_shared_correlation_engine()
+    correlations.add_snapshot(buckets.window(CORRELATION_LOOKBACK_DAYS), buckets.as_of)
+    correlations.append(buckets.tickers, buckets.as_of)
+    
+    return buckets
+
+# Function to load data (responses are cached per ticker and endpoint by the shared cache)
 def load_data(tickers, days):
-    """Load data from Finnhub API and analyze sentiment"""
+    """Load MAX_LOOKBACK_DAYS of data from Finnhub API and bucket its sentiment by day"""
     cache_key = f"tickers={'_'.join(sorted(tickers))}_days={days}"
     logger.info(f"Cache key: {cache_key}")
     
     try:
-        st.info(f"🕒 Fetching news with lookback period: {days} days")
-        
-        finnhub_client = FinnhubClient()
-        sentiment_engine = SentimentEngine()
+        st.info(f"🕒 Fetching news for the last {MAX_LOOKBACK_DAYS} days (showing a {days}-day lookback)")
         
-        batch_data = finnhub_client.get_batch_data(tickers, days)
+        buckets = fetch_buckets(tickers, days)
         
         # Log the total number of news articles for verification
-        total_news = 0
-        news_counts = {}
-        for ticker, data in batch_data.items():
-            news_count = len(data.get('news', []))
-            total_news += news_count
-            news_counts[ticker] = news_count
-            logger.info(f"Found {news_count} news items for {ticker}")
-        
+        news_counts = dict(zip(buckets.tickers, buckets.window(MAX_LOOKBACK_DAYS)['mentions']))
+        total_news = sum(news_counts.values())
         logger.info(f"Total news articles fetched: {total_news}")
         # Show a simplified summary in the UI
         counts_str = ", ".join([f"{t}: {c}" for t, c in news_counts.items()])
         st.info(f"📊 News articles found: {total_news} total ({counts_str})")
         
-        df = sentiment_engine.process_batch_data(batch_data)
-        
-        # Save data to cache
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        df.to_csv(f'./cache/sentiment_data_{timestamp}.csv', index=False)
-        
-        return df
+        return buckets
     except Exception as e:
         logger.error(f"Error loading data: {e}")
         st.error(f"Error loading data: {e}")
@@ -99,37 +172,155 @@ ticker_input = st.sidebar.text_area(
 # Parse tickers
 tickers = [ticker.strip().upper() for ticker in ticker_input.split(',') if ticker.strip()]
 
+# Check tickers against the local symbol index, so typos never cost API calls
+symbol_index = get_shared_symbol_index()
+if symbol_index is not None:
+    with st.sidebar.expander("Find symbols / expand universe"):
+        symbol_query = st.text_input("Search symbols", help="Type the beginning of a symbol")
+        for symbol, description in symbol_index.complete(symbol_query):
+            st.caption(f"**{symbol}** – {description}")
+        
+        exchange = st.selectbox(
+            "Add symbols listed on exchange",
+            ["None"] + symbol_index.exchanges(),
+            help=f"Adds the first {MAX_UNIVERSE_SIZE} symbols in alphabetical order; the listing has no size or liquidity to rank by"
+        )
+        security_types = symbol_index.security_types()
+        security_type = st.selectbox(
+            "Security type",
+            security_types,
+            index=security_types.index("Common Stock") if "Common Stock" in security_types else 0
+        )
+        if exchange != "None":
+            listed = symbol_index.expand(mic=exchange, security_type=security_type)
+            universe = listed[:MAX_UNIVERSE_SIZE]
+            tickers += [t for t in universe if t not in tickers]
+            st.caption(
+                f"Added the first {len(universe)} of {len(listed)} listed symbols in alphabetical order "
+                f"({universe[0]}–{universe[-1]}), not the largest or most traded"
+                if universe else "No symbols listed"
+            )
+    
+    tickers, invalid_tickers = symbol_index.validate(tickers)
+    if invalid_tickers:
+        st.sidebar.warning(f"Ignoring unknown symbols: {', '.join(invalid_tickers)}")
+else:
+    st.sidebar.caption("Loading the symbol list in the background; tickers are not checked yet")
+
 # Time window selection
 time_window = st.sidebar.slider(
     "News lookback period (days)",
     min_value=1,
-    max_value=30,
+    max_value=MAX_LOOKBACK_DAYS,
     value=DEFAULT_TIME_WINDOW,
     help="Number of days to look back for news headlines"
 )
 
-# If lookback period changed, clear cache
-if time_window != st.session_state.lookback_days:
-    st.sidebar.warning(f"Lookback period changed from {st.session_state.lookback_days} to {time_window} days. Click 'Fetch Latest Data' to apply.")
-    st.session_state.lookback_days = time_window
+# Lookback changes are answered from the per-day buckets, no refetch needed
+st.session_state.lookback_days = time_window
+
+def refresh_session_data(tickers, days):
+    """Load data into the session and remember which cache versions it reflects"""
+    st.session_state.ticker_versions = shared_cache.ticker_versions(tickers)
+    st.session_state.loaded_params = tickers
+    st.session_state.pending_refresh = None
+    buckets = load_data(tickers, days)
+    st.session_state.snapshot = None if buckets is None else shared_registry.publish(buckets)
+    st.session_state.last_update = datetime.now()
+
+def replace_session_rows(fresh):
+    """Replace the session's rows for the tickers in fresh buckets"""
+    loaded = st.session_state.loaded_params
+    current = st.session_state.snapshot
+    kept = [] if current is None else [current.buckets.subset([t for t in loaded if t not in fresh.tickers])]
+    merged = SentimentBuckets.concat(kept + [fresh]).subset(loaded)
+    st.session_state.snapshot = shared_registry.publish(merged)
 
 # Fetch data button
 if st.sidebar.button("Fetch Latest Data"):
-    # Clear cache to ensure fresh data
-    st.cache_data.clear()
+    # Only mark this universe's quotes stale, and the news of the tickers most likely to have
+    # new articles (or past their freshness SLA); other sessions' tickers stay cached.
+    # The load refetches every stale entry before saving.
+    for ticker in tickers:
+        shared_scheduler.add(ticker)
+    due = shared_scheduler.plan(REFRESH_BUDGET_PER_CYCLE, tickers=tickers)
+    shared_cache.invalidate(tickers, endpoints=["quote"])
+    shared_cache.invalidate(due, endpoints=["news"])
+    logger.info(f"Refreshing news of {len(due)} of {len(tickers)} tickers")
     with st.spinner("Fetching data from Finnhub and analyzing sentiment..."):
-        st.session_state.data = load_data(tickers, time_window)
-        st.session_state.last_update = datetime.now()
-        
+        refresh_session_data(tickers, time_window)
+elif st.session_state.pending_refresh is not None:
+    # Merge the stale tickers refreshed in the background after a warm start
+    stale, future = st.session_state.pending_refresh
+    if future.done():
+        st.session_state.pending_refresh = None
+        try:
+            fresh = future.result()
+        except Exception as e:
+            logger.error(f"Error refreshing stale tickers: {e}")
+            st.sidebar.error(f"Error refreshing stale tickers: {e}")
+        else:
+            replace_session_rows(fresh)
+            st.session_state.last_update = datetime.now()
+elif st.session_state.snapshot is not None:
+    # Rebuild (and save) only the rows of this session's tickers whose responses were refreshed in the background
+    versions = shared_cache.ticker_versions(st.session_state.loaded_params)
+    changed = [t for t, v in versions.items() if v != st.session_state.ticker_versions.get(t)]
+    if changed:
+        replace_session_rows(fetch_buckets(changed, time_window))
+        st.session_state.ticker_versions = versions
+
 # Show last update time
 if st.session_state.last_update:
-    st.sidebar.info(f"Last updated: {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+    age_minutes = (datetime.now() - st.session_state.last_update).total_seconds() / 60
+    st.sidebar.info(
+        f"Last updated: {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')} "
+        f"({age_minutes:.0f} min ago)"
+    )
+    pending = shared_cache.pending_refreshes()
+    if pending:
+        st.sidebar.caption(f"🔄 Refreshing {pending} stale entries in the background")
+    if st.session_state.pending_refresh is not None:
+        st.sidebar.caption(f"🔄 Refreshing stale tickers: {', '.join(st.session_state.pending_refresh[0])}")
 else:
-    # Load data on first run
-    if st.session_state.data is None:
-        with st.spinner("Loading initial data..."):
-            st.session_state.data = load_data(tickers, time_window)
-            st.session_state.last_update = datetime.now()
+    # First run: show the most recent saved snapshot right away, then refetch only stale tickers
+    if st.session_state.snapshot is None:
+        warm_buckets = load_latest_buckets(tickers)
+        if warm_buckets is None:
+            with st.spinner("Loading initial data..."):
+                refresh_session_data(tickers, time_window)
+        else:
+            st.session_state.snapshot = shared_registry.publish(warm_buckets)
+            st.session_state.loaded_params = tickers
+            st.session_state.ticker_versions = shared_cache.ticker_versions(tickers)
+            st.session_state.last_update = datetime.fromtimestamp(warm_buckets.info['fetched_at'].min())
+            
+            stale = stale_tickers(warm_buckets, tickers)
+            if stale:
+                future = get_refresh_executor().submit(fetch_buckets, stale, time_window)
+                st.session_state.pending_refresh = (stale, future)
+            
+            age_minutes = (datetime.now() - st.session_state.last_update).total_seconds() / 60
+            st.sidebar.info(
+                f"Showing saved snapshot from {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')} "
+                f"({age_minutes:.0f} min old)"
+                + (f"; refreshing {len(stale)} stale tickers in the background" if stale else "")
+            )
+
+# Aggregate the selected lookback from the per-day buckets (shared by every session viewing this snapshot)
+data = None if st.session_state.snapshot is None else st.session_state.snapshot.window(time_window)
+
+# Sentiment and news volume spikes for the current tickers
+alerts = shared_detector.recent_alerts(tickers, limit=5)
+if alerts:
+    st.sidebar.subheader("🚨 Sentiment Alerts")
+    for alert in alerts:
+        metric = "Sentiment" if alert['metric'] == 'sentiment_score' else "News volume"
+        alert_time = datetime.fromtimestamp(alert['timestamp']).strftime('%H:%M')
+        st.sidebar.warning(
+            f"**{alert['ticker']}** {metric} spike at {alert_time}: "
+            f"{alert['value']:.2f} vs. {alert['mean']:.2f} typical (z={alert['z_score']:+.1f})"
+        )
 
 # Divider
 st.sidebar.markdown("---")
@@ -165,8 +356,8 @@ st.title("Stock Sentiment Heatmap")
 st.write(f"**Data settings**: Analyzing {len(tickers)} stocks with a {st.session_state.lookback_days}-day lookback period")
 
 # Check if data is loaded
-if st.session_state.data is not None:
-    df = st.session_state.data
+if data is not None:
+    df = data
     
     # Apply filters
     df = filter_df_by_sector(df, sector_filter)
@@ -204,50 +395,25 @@ if st.session_state.data is not None:
         st.subheader("Sentiment & Price Change Heatmap")
         
         if not df.empty:
-            # Create a copy of the DataFrame for display
-            display_df = format_df_for_display(df)
-            
-            # Debug messages removed
-            
             # Select columns for heatmap
-            heatmap_cols = ['Ticker', 'Company', 'Sector', 'Sentiment Score', 'News Mentions', 'Change (%)']
+            heatmap_cols = ['ticker', 'name', 'sector', 'sentiment_score', 'mentions', 'price_change_pct']
             
             # Ensure all columns exist
-            missing_cols = [col for col in heatmap_cols if col not in display_df.columns]
+            missing_cols = [DISPLAY_COLUMNS[col] for col in heatmap_cols if col not in df.columns]
             if missing_cols:
                 st.error(f"Missing columns in DataFrame: {missing_cols}")
                 # Use available columns only
-                heatmap_cols = [col for col in heatmap_cols if col in display_df.columns]
+                heatmap_cols = [col for col in heatmap_cols if col in df.columns]
             
-            # Create a styled dataframe for the heatmap
-            heatmap_df = display_df[heatmap_cols].copy()
+            # Number formats and cell colors are applied by the Styler when rendering, no copies needed
+            heatmap_style = format_df_for_display(df[heatmap_cols])
+            if 'sentiment_score' in heatmap_cols:
+                heatmap_style = heatmap_style.apply(sentiment_score_styles, subset=['Sentiment Score'])
+            if 'price_change_pct' in heatmap_cols:
+                heatmap_style = heatmap_style.apply(price_change_styles, subset=['Change (%)'])
             
-            # Create a background color dataframe with the same shape
-            bg_colors = pd.DataFrame('', index=heatmap_df.index, columns=heatmap_df.columns)
-            
-            # Set colors for sentiment score
-            try:
-                sentiment_scores = df['sentiment_score'].tolist()
-                for i, score in enumerate(sentiment_scores):
-                    red = int(255 * (1 - max(0, score)))
-                    green = int(255 * max(0, score))
-                    bg_colors.loc[i, 'Sentiment Score'] = f'background-color: rgba({red}, {green}, 0, 0.7)'
-            except Exception as e:
-                st.error(f"Error styling sentiment scores: {e}")
-            
-            # Set colors for price change
-            try:
-                price_changes = df['price_change_pct'].tolist()
-                for i, change in enumerate(price_changes):
-                    red = int(255 * (1 - min(1, max(0, (change + 5) / 10))))
-                    green = int(255 * min(1, max(0, (change + 5) / 10)))
-                    bg_colors.loc[i, 'Change (%)'] = f'background-color: rgba({red}, {green}, 0, 0.7)'
-            except Exception as e:
-                st.error(f"Error styling price changes: {e}")
-            
-            # Apply styles
             st.dataframe(
-                heatmap_df.style.apply(lambda _: bg_colors, axis=None),
+                heatmap_style,
                 use_container_width=True,
                 height=400
             )
@@ -351,6 +517,40 @@ if st.session_state.data is not None:
                     hover_data=['mentions']
                 )
                 st.plotly_chart(negative_fig, use_container_width=True)
+            
+            # Correlations across the daily history
+            st.subheader("Sentiment vs. Price Change Over Time")
+            correlations = get_shared_correlation_engine()
+            
+            if len(correlations) < CORRELATION_MIN_PERIODS:
+                st.info(f"At least {CORRELATION_MIN_PERIODS} days of history are needed to compute correlations.")
+            else:
+                shown_tickers = [t for t in df['ticker'] if t in correlations.tickers]
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    # Positive lags: sentiment leads price change
+                    lead_lag = correlations.lead_lag(max_lag=3)[shown_tickers]
+                    lead_lag_fig = px.imshow(
+                        lead_lag.T,
+                        zmin=-1,
+                        zmax=1,
+                        color_continuous_scale='RdYlGn',
+                        labels={'x': 'Lag (days)', 'y': 'Ticker', 'color': 'Correlation'},
+                        title="Sentiment / Price Change Lead-Lag Correlation"
+                    )
+                    st.plotly_chart(lead_lag_fig, use_container_width=True)
+                
+                with col2:
+                    cross_fig = px.imshow(
+                        correlations.cross_correlation(shown_tickers),
+                        zmin=-1,
+                        zmax=1,
+                        color_continuous_scale='RdYlGn',
+                        labels={'color': 'Correlation'},
+                        title="Cross-Ticker Sentiment Correlation"
+                    )
+                    st.plotly_chart(cross_fig, use_container_width=True)
         else:
             st.warning("No data available for the selected filters.")
 else:
@@ -358,5 +558,11 @@ else:
 
 # Footer
 st.markdown("---")
-st.caption("Powered by Finnhub API and VADER Sentiment Analysis. Data refreshes every hour.")
-st.caption("© Stock Sentiment Heatmap " + str(datetime.now().year)) 
\ No newline at end of file
+st.caption("Powered by Finnhub API and VADER Sentiment Analysis. Quotes refresh every minute, news as the refresh scheduler plans it.")
+st.caption("© Stock Sentiment Heatmap " + str(datetime.now().year))
+
+# Poll the background refresh after a warm start with short reruns instead of waiting for it,
+# so the session stays responsive; the rerun that finds it done merges its data
+if st.session_state.pending_refresh is not None:
+    time.sleep(WARM_START_POLL_SECONDS)
+    st.experimental_rerun()
@@ -7,15 +7,106 @@ load_dotenv()
 # Finnhub API key
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
 
+# Pool of Finnhub API keys (comma-separated); falls back to the single key above
+FINNHUB_API_KEYS = [
+    key.strip() for key in os.getenv("FINNHUB_API_KEYS", "").split(",") if key.strip()
+] or ([FINNHUB_API_KEY] if FINNHUB_API_KEY else [])
+
+# Per-key rate budget (Finnhub free tier allows 60 calls per minute)
+FINNHUB_CALLS_PER_MINUTE = int(os.getenv("FINNHUB_CALLS_PER_MINUTE", 60))
+FINNHUB_BURST_SIZE = int(os.getenv("FINNHUB_BURST_SIZE", 10))  # calls a key may make back to back
+
+# Transport under FinnhubClient: live (call the API), record (call the API and archive
+# every response) or replay (serve archived responses offline)
+FINNHUB_TRANSPORT = os.getenv("FINNHUB_TRANSPORT", "live").lower()
+FINNHUB_ARCHIVE = os.getenv("FINNHUB_ARCHIVE", "./cache/finnhub_archive.zip")
+FINNHUB_RECORD_CHECKPOINT_CALLS = 100  # recorded calls between writes of the archive index
+FINNHUB_REPLAY_REALTIME = os.getenv("FINNHUB_REPLAY_REALTIME", "false").lower() in ("1", "true", "yes")
+# Replay a request that was not recorded with the latest response recorded for the same method
+# and symbol, instead of failing (useful for browsing, but breaks deterministic regression runs)
+FINNHUB_REPLAY_FALLBACK = os.getenv("FINNHUB_REPLAY_FALLBACK", "false").lower() in ("1", "true", "yes")
+
+# Backoff applied to a key after Finnhub answers 429 Too Many Requests
+FINNHUB_BACKOFF_SECONDS = 5.0
+FINNHUB_MAX_BACKOFF_SECONDS = 300.0
+FINNHUB_MAX_RETRIES = 5  # attempts per API call before giving up
+
 # App configuration
 DEFAULT_STOCKS = ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "TSLA", "NVDA"]
 DEFAULT_TIME_WINDOW = 7  # days
+MAX_LOOKBACK_DAYS = 30  # news is fetched and bucketed once for this horizon
 DEFAULT_NEWS_COUNT = 50  # number of news to fetch per stock
 
+# Per-endpoint cache lifetimes in seconds (profiles rarely change, quotes move constantly).
+# The news of tickers in the refresh scheduler only expires when the scheduler polls it.
+CACHE_TTL_SECONDS = {
+    "profile": 24 * 3600,
+    "quote": 60,
+    "news": 15 * 60,
+}
+CACHE_MAX_ENTRIES = 5000
+
+# Serve stale cache entries immediately and refresh them in the background
+STALE_WHILE_REVALIDATE = os.getenv("STALE_WHILE_REVALIDATE", "true").lower() in ("1", "true", "yes")
+CACHE_REFRESH_WORKERS = 4
+
+# Directory where sentiment snapshots (sentiment_data_<timestamp>.csv, plus the per-day
+# buckets in sentiment_buckets_<timestamp>.npz) are saved
+SNAPSHOT_DIR = "./cache"
+if FINNHUB_TRANSPORT == "replay":
+    # Replayed data is old; keep it away from the live snapshots, history and API
+    SNAPSHOT_DIR = os.path.join(SNAPSHOT_DIR, "replay")
+SNAPSHOT_MAX_FILES = 100  # newest files of each kind kept; older ones are deleted on save
+
+# Warm start: snapshot data younger than this is shown without refetching
+WARM_START_MAX_AGE_SECONDS = 15 * 60
+WARM_START_MAX_FILES = 50  # newest bucket files searched for the requested tickers
+WARM_START_POLL_SECONDS = 2  # rerun interval while stale tickers are refreshed in the background
+
+# Local index of listed symbols (from Finnhub's stock-symbol listing)
+SYMBOL_EXCHANGE = "US"
+SYMBOL_INDEX_MAX_AGE_SECONDS = 7 * 24 * 3600  # listings change rarely
+MAX_UNIVERSE_SIZE = 100  # tickers added at most when expanding an exchange
+
+# Sentiment / return correlation analytics
+CORRELATION_MAX_DAYS = 365  # most recent days kept (one value per ticker per day)
+CORRELATION_MIN_PERIODS = 3  # observations needed for a correlation
+CORRELATION_LOOKBACK_DAYS = 0  # fixed sentiment lookback of the daily values (0: each day's own articles)
+
+# Read-only snapshot API (api_server.py)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", 8502))
+API_MAX_CACHED_RESPONSES = 256  # rendered (filters, format) responses kept per snapshot
+API_LOOKBACK_DAYS = int(os.getenv("API_LOOKBACK_DAYS", DEFAULT_TIME_WINDOW))  # lookback of the served table
+# Latest row of every ticker saved so far, at API_LOOKBACK_DAYS (written on each save, served by the API)
+LATEST_SNAPSHOT_FILE = "sentiment_latest.csv"
+
+# Adaptive news refresh: freshness SLA (seconds) per tier; a ticker is always
+# repolled once its data is older than its tier's SLA
+REFRESH_TIERS = {
+    "high": 5 * 60,
+    "normal": 30 * 60,
+    "low": 4 * 3600,
+}
+DEFAULT_REFRESH_TIER = "normal"
+REFRESH_RATE_ALPHA = 0.3  # EWMA weight of the newest article-rate sample
+REFRESH_BUDGET_PER_CYCLE = int(os.getenv("REFRESH_BUDGET_PER_CYCLE", 20))  # news calls per cycle
+
+# Read-only snapshots shared by all dashboard sessions (snapshot_registry.py)
+SNAPSHOT_REGISTRY_MAX_SNAPSHOTS = 32  # unreferenced snapshots kept for reuse; referenced ones are never released
+
 # Sentiment thresholds
 POSITIVE_THRESHOLD = 0.05
 NEGATIVE_THRESHOLD = -0.05
 
+# Sentiment anomaly detection (EWMA z-scores per ticker)
+ANOMALY_EWMA_ALPHA = 0.1  # weight of the newest observation
+ANOMALY_Z_THRESHOLD = 3.0
+ANOMALY_MIN_OBSERVATIONS = 10  # observations needed before a ticker can alert
+ANOMALY_MAX_SEEN_ARTICLES = 1000  # article ids remembered per ticker
+ANOMALY_MAX_ALERTS = 200  # alerts kept in memory
+ANOMALY_MIN_INTERVAL_SECONDS = 300  # shorter gaps between news polls are merged into the next one
+
 # Sectors for filtering
 SECTORS = [
     "Technology", 
@@ -0,0 +1,3 @@
+# The test_finnhub_<endpoint>.py scripts call the live API when run directly
+# (python test_finnhub_quote.py); pytest only collects the offline tests
+collect_ignore = ["test_finnhub_api.py", "test_finnhub_profile.py", "test_finnhub_quote.py"]
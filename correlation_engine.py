@@ -0,0 +1,365 @@
+import os
+import glob
+import tempfile
+import threading
+import logging
+import datetime
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Optional
+from config import CORRELATION_MAX_DAYS, CORRELATION_MIN_PERIODS, CORRELATION_LOOKBACK_DAYS, SNAPSHOT_DIR
+
+# Set up a logger
+logger = logging.getLogger('correlation_engine')
+
+# Daily sentiment and price change values, kept independently of the snapshot files
+HISTORY_PATH = os.path.join(SNAPSHOT_DIR, 'sentiment_daily.csv')
+
+def _pearson(n, sx, sy, sxx, syy, sxy, min_periods: int) -> np.ndarray:
+    """
+    Element-wise Pearson correlation from co-observed sums
+
+    Entries with fewer than min_periods observations or (numerically) zero variance are NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        corr = cov / np.sqrt(var_x * var_y)
+    # Constant series leave only rounding error in the variance
+    flat = ~(var_x > 1e-12 * n * sxx) | ~(var_y > 1e-12 * n * syy)
+    corr[(n < min_periods) | flat] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+def _masked_moments(x: np.ndarray, y: np.ndarray):
+    """Zero out entries where either array is missing and return the pieces of _pearson"""
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    return mask.astype(float), x, y, x * x, y * y, x * y
+
+class SentimentCorrelationEngine:
+    def __init__(self, max_days: int = CORRELATION_MAX_DAYS):
+        """
+        Initialize an engine holding aligned (day x ticker) sentiment and return arrays
+
+        Snapshots are sampled on a daily grid: each ticker keeps the last values
+        seen on a day, and days without snapshots stay missing, so lags are always
+        measured in days. Running pairwise sums keep the cross-ticker correlation
+        matrix up to date in O(tickers^2) per snapshot, and every query is a
+        batched NumPy computation over all tickers.
+
+        Args:
+            max_days: Number of most recent days kept
+        """
+        self.max_days = max_days
+        self.tickers: List[str] = []
+        self.dates: List[datetime.date] = []
+        self._columns: Dict[str, int] = {}
+        self._sentiment = np.full((0, 0), np.nan)
+        self._returns = np.full((0, 0), np.nan)
+        self._start = 0  # first active row of the arrays
+        self._logged_rows = 0  # rows in the history file, including overwritten ones
+        self._lock = threading.RLock()
+
+        # Pairwise sums over the stored days: entry [i, j] only counts rows where
+        # both tickers have a sentiment score
+        self._n = np.zeros((0, 0))
+        self._sx = np.zeros((0, 0))
+        self._sxx = np.zeros((0, 0))
+        self._sxy = np.zeros((0, 0))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _add_tickers(self, tickers: List[str]):
+        """Add columns for tickers not seen before"""
+        new_tickers = [t for t in dict.fromkeys(tickers) if t not in self._columns]
+        if not new_tickers:
+            return
+
+        for ticker in new_tickers:
+            self._columns[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+
+        extra = len(new_tickers)
+        pad_columns = ((0, 0), (0, extra))
+        self._sentiment = np.pad(self._sentiment, pad_columns, constant_values=np.nan)
+        self._returns = np.pad(self._returns, pad_columns, constant_values=np.nan)
+
+        pad_square = ((0, extra), (0, extra))
+        self._n = np.pad(self._n, pad_square)
+        self._sx = np.pad(self._sx, pad_square)
+        self._sxx = np.pad(self._sxx, pad_square)
+        self._sxy = np.pad(self._sxy, pad_square)
+
+    def _append_row(self, sentiment: np.ndarray, returns: np.ndarray):
+        """Append a row, compacting or doubling the arrays when they are full"""
+        end = self._start + len(self.dates)
+        capacity = self._sentiment.shape[0]
+
+        if end >= capacity:
+            active = slice(self._start, end)
+            new_capacity = max(8, 2 * len(self.dates) + 1)
+            for name in ('_sentiment', '_returns'):
+                grown = np.full((new_capacity, len(self.tickers)), np.nan)
+                grown[:len(self.dates)] = getattr(self, name)[active]
+                setattr(self, name, grown)
+            self._start = 0
+            end = len(self.dates)
+
+        self._sentiment[end] = sentiment
+        self._returns[end] = returns
+
+    def _clear(self):
+        """Drop every stored day, keeping the ticker columns"""
+        self._sentiment[:] = np.nan
+        self._returns[:] = np.nan
+        for sums in (self._n, self._sx, self._sxx, self._sxy):
+            sums[:] = 0.0
+        self._start = 0
+        self.dates = []
+
+    def _accumulate(self, row: np.ndarray, sign: float):
+        """Add (sign=1) or remove (sign=-1) a sentiment row from the pairwise sums"""
+        mask = (~np.isnan(row)).astype(float)
+        x = np.where(mask > 0, row, 0.0)
+        self._n += sign * np.outer(mask, mask)
+        self._sx += sign * np.outer(x, mask)
+        self._sxx += sign * np.outer(x * x, mask)
+        self._sxy += sign * np.outer(x, x)
+
+    def add_snapshot(self, df: pd.DataFrame, date: datetime.date):
+        """
+        Record a sentiment snapshot as the latest values of its tickers on a day
+
+        Args:
+            df: DataFrame from SentimentBuckets.window(), always with the same
+                lookback (CORRELATION_LOOKBACK_DAYS) so days are comparable
+            date: Day of the snapshot; snapshots older than the kept days are ignored
+        """
+        with self._lock:
+            if self.dates and date < self.dates[0]:
+                return
+            self._add_tickers(df['ticker'].tolist())
+            columns = np.array([self._columns[t] for t in df['ticker']], dtype=int)
+
+            if self.dates and (date - self.dates[-1]).days > self.max_days:
+                self._clear()
+
+            # Append rows up to the snapshot's day; days without snapshots stay missing
+            while not self.dates or self.dates[-1] < date:
+                next_date = self.dates[-1] + datetime.timedelta(days=1) if self.dates else date
+                self._append_row(np.full(len(self.tickers), np.nan), np.full(len(self.tickers), np.nan))
+                self.dates.append(next_date)
+
+            row = self._start + (date - self.dates[0]).days
+            self._accumulate(self._sentiment[row], -1.0)
+            self._sentiment[row, columns] = df['sentiment_score'].to_numpy(dtype=float)
+            self._returns[row, columns] = df['price_change_pct'].to_numpy(dtype=float)
+            self._accumulate(self._sentiment[row], 1.0)
+
+            while len(self.dates) > self.max_days:
+                self._accumulate(self._sentiment[self._start], -1.0)
+                self._sentiment[self._start] = np.nan
+                self._returns[self._start] = np.nan
+                self._start += 1
+                self.dates.pop(0)
+
+    def _active(self):
+        """Views of the stored (day x ticker) sentiment and return arrays"""
+        active = slice(self._start, self._start + len(self.dates))
+        return self._sentiment[active], self._returns[active]
+
+    def cross_correlation(self, tickers: Optional[List[str]] = None, min_periods: int = CORRELATION_MIN_PERIODS) -> pd.DataFrame:
+        """
+        Get the cross-ticker sentiment correlation matrix
+
+        Args:
+            tickers: Tickers to include (None for all)
+            min_periods: Minimum co-observed days for a correlation
+
+        Returns:
+            Square DataFrame of pairwise correlations
+        """
+        with self._lock:
+            corr = _pearson(
+                self._n, self._sx, self._sx.T, self._sxx, self._sxx.T, self._sxy, min_periods
+            )
+            result = pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+        if tickers is not None:
+            tickers = [t for t in tickers if t in self._columns]
+            result = result.loc[tickers, tickers]
+        return result
+
+    def rolling_correlation(self, window: int, min_periods: int = CORRELATION_MIN_PERIODS) -> pd.DataFrame:
+        """
+        Get the rolling correlation between each ticker's sentiment and price change
+
+        Args:
+            window: Number of days in each window
+            min_periods: Minimum observations in a window for a correlation
+
+        Returns:
+            DataFrame indexed by day with one column per ticker
+        """
+        with self._lock:
+            sentiment, returns = self._active()
+            moments = _masked_moments(sentiment, returns)
+            dates = list(self.dates)
+            tickers = list(self.tickers)
+
+        # Windowed sums from cumulative sums along the time axis
+        ends = np.arange(1, len(dates) + 1)
+        starts = np.maximum(ends - window, 0)
+        sums = []
+        for moment in moments:
+            cumulative = np.vstack([np.zeros((1, moment.shape[1])), np.cumsum(moment, axis=0)])
+            sums.append(cumulative[ends] - cumulative[starts])
+
+        corr = _pearson(*sums, min_periods=min_periods)
+        return pd.DataFrame(corr, index=dates, columns=tickers)
+
+    def lead_lag(self, max_lag: int = 3, min_periods: int = CORRELATION_MIN_PERIODS) -> pd.DataFrame:
+        """
+        Correlate each ticker's sentiment with its price change `lag` days later
+
+        Positive lags mean sentiment leads returns; negative lags mean it trails them.
+
+        Args:
+            max_lag: Largest lag (in days) in each direction
+            min_periods: Minimum overlapping observations for a correlation
+
+        Returns:
+            DataFrame indexed by lag with one column per ticker
+        """
+        with self._lock:
+            sentiment, returns = self._active()
+            sentiment, returns = sentiment.copy(), returns.copy()
+            tickers = list(self.tickers)
+
+        length = sentiment.shape[0]
+        lags = list(range(-max_lag, max_lag + 1))
+        rows = []
+        for lag in lags:
+            if abs(lag) >= length:
+                rows.append(np.full(len(tickers), np.nan))
+                continue
+            if lag >= 0:
+                x, y = sentiment[:length - lag], returns[lag:]
+            else:
+                x, y = sentiment[-lag:], returns[:length + lag]
+            sums = [moment.sum(axis=0) for moment in _masked_moments(x, y)]
+            rows.append(_pearson(*sums, min_periods=min_periods))
+
+        return pd.DataFrame(np.vstack(rows), index=lags, columns=tickers)
+
+    def _history(self, tickers: Optional[List[str]] = None, date: Optional[datetime.date] = None) -> pd.DataFrame:
+        """Stored values as a long (date, ticker) DataFrame, optionally of some tickers on one day (caller holds the lock)"""
+        sentiment, returns = self._active()
+        dates = self.dates
+        if date is not None:
+            row = (date - self.dates[0]).days
+            sentiment, returns, dates = sentiment[row:row + 1], returns[row:row + 1], [date]
+        columns = list(range(len(self.tickers))) if tickers is None else [self._columns[t] for t in tickers]
+
+        return pd.DataFrame({
+            'date': np.repeat([d.isoformat() for d in dates], len(columns)),
+            'ticker': np.tile(np.array(self.tickers, dtype=object)[columns], len(dates)),
+            'sentiment_score': sentiment[:, columns].ravel(),
+            'price_change_pct': returns[:, columns].ravel(),
+        }).dropna(subset=['sentiment_score', 'price_change_pct'], how='all')
+
+    def save(self, path: str = HISTORY_PATH):
+        """Save the daily values as a long (date, ticker) CSV, replacing the file atomically"""
+        with self._lock:
+            history = self._history()
+
+            fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.csv', dir=os.path.dirname(path) or '.')
+            with os.fdopen(fd, 'w', newline='') as f:
+                history.to_csv(f, index=False)
+            os.replace(tmp_path, path)
+            self._logged_rows = len(history)
+
+    def append(self, tickers: List[str], date: datetime.date, path: str = HISTORY_PATH):
+        """
+        Append the values of some tickers on a day to the history file
+
+        Later rows of a (date, ticker) override earlier ones when loading. The file
+        is rewritten with save() when it does not exist yet, or once overwritten
+        rows make up more than half of it.
+
+        Args:
+            tickers: Tickers whose values changed (as passed to add_snapshot())
+            date: Day of the values
+            path: History file
+        """
+        with self._lock:
+            if not self.dates or not self.dates[0] <= date <= self.dates[-1]:
+                return
+            sentiment, returns = self._active()
+            stored = int((~np.isnan(sentiment) | ~np.isnan(returns)).sum())
+            if not os.path.exists(path) or self._logged_rows > 2 * stored:
+                self.save(path)
+                return
+
+            rows = self._history([t for t in dict.fromkeys(tickers) if t in self._columns], date)
+            with open(path, 'a', newline='') as f:
+                rows.to_csv(f, index=False, header=False)
+            self._logged_rows += len(rows)
+
+    @classmethod
+    def load(cls, path: str = HISTORY_PATH, max_days: int = CORRELATION_MAX_DAYS) -> 'SentimentCorrelationEngine':
+        """Load daily values saved with save() and append()"""
+        engine = cls(max_days)
+        history = pd.read_csv(path)
+        for date, day in history.groupby('date', sort=True):
+            engine.add_snapshot(day.drop_duplicates('ticker', keep='last'), datetime.date.fromisoformat(date))
+        engine._logged_rows = len(history)
+        return engine
+
+    @classmethod
+    def from_snapshot_files(cls, directory: str = SNAPSHOT_DIR, max_days: int = CORRELATION_MAX_DAYS) -> 'SentimentCorrelationEngine':
+        """
+        Build an engine from the saved daily history, or else from the sentiment_buckets_<timestamp>.npz snapshots
+
+        Args:
+            directory: Directory containing the history and the snapshots
+            max_days: Number of most recent days kept
+
+        Returns:
+            SentimentCorrelationEngine loaded with the history or the snapshots in time order
+        """
+        history_path = os.path.join(directory, os.path.basename(HISTORY_PATH))
+        if os.path.exists(history_path):
+            try:
+                engine = cls.load(history_path, max_days)
+                logger.info(f"Loaded {len(engine)} days for {len(engine.tickers)} tickers")
+                return engine
+            except Exception as e:
+                logger.error(f"Error loading correlation history {history_path}: {e}")
+
+        from sentiment_engine import SentimentBuckets
+        engine = cls(max_days)
+        for path in sorted(glob.glob(os.path.join(directory, 'sentiment_buckets_*.npz'))):
+            try:
+                buckets = SentimentBuckets.load(path)
+                engine.add_snapshot(buckets.window(CORRELATION_LOOKBACK_DAYS), buckets.as_of)
+            except Exception as e:
+                logger.error(f"Skipping snapshot {path}: {e}")
+
+        logger.info(f"Built {len(engine)} days for {len(engine.tickers)} tickers from saved snapshots")
+        return engine
+
+# Engine shared by every dashboard session, loaded from the saved snapshots on first use
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+def get_shared_correlation_engine() -> SentimentCorrelationEngine:
+    """Get (and lazily load) the process-wide correlation engine"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = SentimentCorrelationEngine.from_snapshot_files()
+        return _shared_engine
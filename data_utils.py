@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from pandas.io.formats.style import Styler
 from typing import List, Dict, Any, Optional
 from config import SECTORS
 
@@ -78,42 +79,71 @@ def create_color_scale(df: pd.DataFrame, column: str) -> List[str]:
     else:
         return ["rgb(240, 240, 240)"] * len(df)
 
-def format_df_for_display(df: pd.DataFrame) -> pd.DataFrame:
+# Display names of the DataFrame columns
+DISPLAY_COLUMNS = {
+    'ticker': 'Ticker',
+    'name': 'Company',
+    'sector': 'Sector',
+    'sentiment_score': 'Sentiment Score',
+    'sentiment': 'Sentiment',
+    'mentions': 'News Mentions',
+    'current_price': 'Price ($)',
+    'price_change': 'Change ($)',
+    'price_change_pct': 'Change (%)'
+}
+
+def format_df_for_display(df: pd.DataFrame) -> Styler:
     """
     Format DataFrame for display in Streamlit
     
+    Numbers are formatted by the Styler at render time and columns are renamed
+    without copying, so the (possibly shared) data is never duplicated.
+    
     Args:
         df: DataFrame containing stock data
         
     Returns:
-        Formatted DataFrame for display
-    """
-    display_df = df.copy()
-    
-    # Format percentage columns
-    if 'price_change_pct' in display_df.columns:
-        display_df['price_change_pct'] = display_df['price_change_pct'].apply(lambda x: f"{x:.2f}%")
-    
-    # Format sentiment score
-    if 'sentiment_score' in display_df.columns:
-        display_df['sentiment_score'] = display_df['sentiment_score'].apply(lambda x: f"{x:.2f}")
-    
-    # Rename columns for better display
-    column_map = {
-        'ticker': 'Ticker',
-        'name': 'Company',
-        'sector': 'Sector',
-        'sentiment_score': 'Sentiment Score',
-        'sentiment': 'Sentiment',
-        'mentions': 'News Mentions',
-        'current_price': 'Price ($)',
-        'price_change': 'Change ($)',
-        'price_change_pct': 'Change (%)'
+        Styler with display column names and number formats
+    """
+    display_df = df.rename(columns=DISPLAY_COLUMNS, copy=False)
+    
+    formats = {
+        'Change (%)': "{:.2f}%",
+        'Sentiment Score': "{:.2f}"
     }
+    return display_df.style.format({col: fmt for col, fmt in formats.items() if col in display_df.columns})
+
+def sentiment_score_styles(scores: pd.Series) -> List[str]:
+    """
+    Background colors for sentiment scores (red = negative, green = positive)
     
-    display_df = display_df.rename(columns=column_map)
+    Args:
+        scores: Sentiment scores
+        
+    Returns:
+        List of CSS styles, for Styler.apply()
+    """
+    positive = scores.clip(lower=0)
+    return [
+        f'background-color: rgba({int(255 * (1 - x))}, {int(255 * x)}, 0, 0.7)'
+        for x in positive
+    ]
+
+def price_change_styles(changes: pd.Series) -> List[str]:
+    """
+    Background colors for price changes in percent (red = -5% or less, green = +5% or more)
     
-    return display_df
+    Args:
+        changes: Price changes in percent
+        
+    Returns:
+        List of CSS styles, for Styler.apply()
+    """
+    scaled = ((changes + 5) / 10).clip(0, 1)
+    return [
+        f'background-color: rgba({int(255 * (1 - x))}, {int(255 * x)}, 0, 0.7)'
+        for x in scaled
+    ]
 
 def get_sector_counts(df: pd.DataFrame) -> Dict[str, int]:
     """
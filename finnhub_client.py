@@ -1,20 +1,76 @@
-import finnhub
 import datetime
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from config import FINNHUB_API_KEY, DEFAULT_NEWS_COUNT
+from config import DEFAULT_NEWS_COUNT
+from key_pool import ApiKeyPool
+from finnhub_transport import LiveTransport, get_shared_transport
+from single_flight import SingleFlight, shared_flight
+from ticker_cache import TickerCache, shared_cache
 
 # Set up a logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('finnhub_client')
 
 class FinnhubClient:
-    def __init__(self):
-        """Initialize Finnhub client with API key from config"""
-        if not FINNHUB_API_KEY:
-            raise ValueError("FINNHUB_API_KEY is not set. Please add it to your .env file.")
-        self.client = finnhub.Client(api_key=FINNHUB_API_KEY)
+    def __init__(
+        self,
+        key_pool: Optional[ApiKeyPool] = None,
+        flight: Optional[SingleFlight] = None,
+        cache: Optional[TickerCache] = None,
+        transport=None,
+    ):
+        """
+        Initialize Finnhub client with the transport selected in config
+
+        Args:
+            key_pool: Pool of API keys for a live transport (defaults to the process-wide pool)
+            flight: Single-flight group for coalescing identical in-flight requests
+                (defaults to the process-wide group)
+            cache: Per-ticker response cache (defaults to the process-wide cache)
+            transport: LiveTransport, RecordingTransport or ReplayTransport
+                (defaults to the process-wide transport, see FINNHUB_TRANSPORT)
+        """
+        if transport is None:
+            transport = LiveTransport(key_pool) if key_pool is not None else get_shared_transport()
+        self.transport = transport
+        self.flight = flight or shared_flight
+        self.cache = cache or shared_cache
+
+    def _call(self, method: str, **kwargs) -> Any:
+        """
+        Call a Finnhub endpoint through the transport
+
+        Args:
+            method: Name of the finnhub.Client method
+            **kwargs: Arguments for the method
+
+        Returns:
+            The endpoint's response
+        """
+        return self.transport.call(method, **kwargs)
+
+    def _fetch(self, endpoint: str, ticker: str, params: tuple, method: str, **kwargs) -> Any:
+        """
+        Fetch an endpoint for a ticker through the response cache and the single-flight group
+
+        Args:
+            endpoint: Endpoint name used for caching and invalidation (profile, quote, news)
+            ticker: Stock symbol
+            params: Remaining request parameters that identify the response
+            method: Name of the finnhub.Client method
+            **kwargs: Arguments for the method
+
+        Returns:
+            The endpoint's response
+        """
+        return self.cache.get_or_fetch(
+            endpoint,
+            ticker,
+            params,
+            lambda: self.flight.do((endpoint, ticker) + params, lambda: self._call(method, **kwargs))
+        )
     
     def get_company_profile(self, ticker: str) -> Dict[str, Any]:
         """
@@ -27,7 +83,7 @@ class FinnhubClient:
             Dictionary containing company information
         """
         try:
-            return self.client.company_profile2(symbol=ticker)
+            return self._fetch('profile', ticker, (), 'company_profile2', symbol=ticker)
         except Exception as e:
             print(f"Error fetching company profile for {ticker}: {e}")
             return {}
@@ -43,7 +99,7 @@ class FinnhubClient:
             Dictionary containing price information
         """
         try:
-            return self.client.quote(ticker)
+            return self._fetch('quote', ticker, (), 'quote', symbol=ticker)
         except Exception as e:
             print(f"Error fetching quote for {ticker}: {e}")
             return {}
@@ -60,12 +116,17 @@ class FinnhubClient:
             List of news items
         """
         try:
-            end_date = datetime.datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+            now = self.transport.now()
+            end_date = now.strftime('%Y-%m-%d')
+            start_date = (now - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
             
             logger.info(f"Fetching news for {ticker} from {start_date} to {end_date} ({days} days lookback)")
             
-            news = self.client.company_news(
+            news = self._fetch(
+                'news',
+                ticker,
+                (start_date, end_date),
+                'company_news',
                 symbol=ticker,
                 _from=start_date,
                 to=end_date
@@ -84,6 +145,22 @@ class FinnhubClient:
             logger.error(f"Error fetching news for {ticker}: {e}")
             return []
     
+    def get_stock_symbols(self, exchange: str = "US") -> List[Dict[str, Any]]:
+        """
+        Get all symbols listed on an exchange
+        
+        Args:
+            exchange: Exchange code (e.g. US)
+            
+        Returns:
+            List of symbol dictionaries (symbol, description, type, mic, ...)
+        """
+        try:
+            return self._call('stock_symbols', exchange=exchange) or []
+        except Exception as e:
+            logger.error(f"Error fetching stock symbols for {exchange}: {e}")
+            return []
+    
     def get_batch_data(self, tickers: List[str], days: int = 7) -> Dict[str, Dict[str, Any]]:
         """
         Get all data for a list of tickers
@@ -95,17 +172,16 @@ class FinnhubClient:
         Returns:
             Dictionary containing data for each ticker
         """
-        results = {}
-        
-        for ticker in tickers:
-            profile = self.get_company_profile(ticker)
-            quote = self.get_quote(ticker)
-            news = self.get_news(ticker, days)
-            
-            results[ticker] = {
-                "profile": profile,
-                "quote": quote,
-                "news": news,
+        def fetch(ticker: str) -> Dict[str, Any]:
+            return {
+                "profile": self.get_company_profile(ticker),
+                "quote": self.get_quote(ticker),
+                "news": self.get_news(ticker, days),
             }
-        
-        return results 
\ No newline at end of file
+
+        # One worker per key, so throughput grows with the size of the pool
+        workers = max(1, min(len(tickers), self.transport.max_workers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = list(executor.map(fetch, tickers))
+
+        return dict(zip(tickers, fetched)) 
\ No newline at end of file
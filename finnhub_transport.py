@@ -0,0 +1,289 @@
+import json
+import atexit
+import time
+import zipfile
+import hashlib
+import datetime
+import threading
+import logging
+import finnhub
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+from config import (
+    FINNHUB_API_KEYS,
+    FINNHUB_MAX_RETRIES,
+    FINNHUB_TRANSPORT,
+    FINNHUB_ARCHIVE,
+    FINNHUB_REPLAY_REALTIME,
+    FINNHUB_REPLAY_FALLBACK,
+    FINNHUB_RECORD_CHECKPOINT_CALLS,
+)
+from key_pool import ApiKeyPool
+
+# Set up a logger
+logger = logging.getLogger('finnhub_transport')
+
+# Key pool shared by every live transport in the process, so rate budgets are global
+_shared_key_pool = None
+_shared_key_pool_lock = threading.Lock()
+
+def get_shared_key_pool() -> ApiKeyPool:
+    """Get (and lazily create) the process-wide API key pool"""
+    global _shared_key_pool
+    with _shared_key_pool_lock:
+        if _shared_key_pool is None:
+            if not FINNHUB_API_KEYS:
+                raise ValueError("FINNHUB_API_KEY is not set. Please add it to your .env file.")
+            _shared_key_pool = ApiKeyPool(FINNHUB_API_KEYS)
+        return _shared_key_pool
+
+def request_key(method: str, kwargs: Dict[str, Any]) -> str:
+    """Stable identifier of a request, used to name archive entries"""
+    canonical = json.dumps({'method': method, 'kwargs': kwargs}, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+class LiveTransport:
+    def __init__(self, key_pool: Optional[ApiKeyPool] = None):
+        """
+        Transport calling the Finnhub API, spreading calls over a pool of API keys
+
+        Args:
+            key_pool: Pool of API keys to use (defaults to the process-wide pool)
+        """
+        self.key_pool = key_pool or get_shared_key_pool()
+        self.clients = {api_key.key: finnhub.Client(api_key=api_key.key) for api_key in self.key_pool.keys}
+
+    @property
+    def max_workers(self) -> int:
+        """Concurrent calls worth making (one per key)"""
+        return len(self.key_pool)
+
+    def now(self) -> datetime.datetime:
+        """Current time, used to compute request date ranges"""
+        return datetime.datetime.now()
+
+    def call(self, method: str, **kwargs) -> Any:
+        """
+        Call a Finnhub endpoint on the next key with budget, retrying throttled calls on other keys
+
+        Args:
+            method: Name of the finnhub.Client method
+            **kwargs: Arguments for the method
+
+        Returns:
+            The endpoint's response
+        """
+        for attempt in range(FINNHUB_MAX_RETRIES):
+            api_key = self.key_pool.acquire()
+            try:
+                result = getattr(self.clients[api_key.key], method)(**kwargs)
+            except finnhub.FinnhubAPIException as e:
+                if e.status_code != 429:
+                    raise
+                retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+                self.key_pool.report_throttled(
+                    api_key, float(retry_after) if retry_after and retry_after.isdigit() else None
+                )
+                continue
+            self.key_pool.report_success(api_key)
+            return result
+
+        raise RuntimeError(f"{method} was throttled on {FINNHUB_MAX_RETRIES} attempts")
+
+class RecordingTransport:
+    def __init__(
+        self,
+        inner: LiveTransport,
+        archive_path: str = FINNHUB_ARCHIVE,
+        checkpoint_calls: int = FINNHUB_RECORD_CHECKPOINT_CALLS
+    ):
+        """
+        Transport passing calls to another transport and recording every response
+
+        Responses are appended to a deflate-compressed zip archive, one entry per
+        call named <method>/<request key>/<sequence>.json, so the archive's central
+        directory doubles as an index by request. The archive stays open; its
+        central directory is written every checkpoint_calls calls and on close()
+        (called at exit), so a crash loses at most the calls since the last checkpoint.
+
+        Args:
+            inner: Transport making the actual calls
+            archive_path: Archive to append to (created if missing)
+            checkpoint_calls: Recorded calls between writes of the central directory
+        """
+        self.inner = inner
+        self.archive_path = archive_path
+        self.checkpoint_calls = checkpoint_calls
+        self._lock = threading.Lock()
+        self._sequence = defaultdict(int)
+        self._unsaved = 0
+
+        self._archive = zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_DEFLATED)
+        for name in self._archive.namelist():
+            parts = name.split('/')
+            if len(parts) == 3:
+                self._sequence[parts[1]] = max(self._sequence[parts[1]], int(parts[2][:-len('.json')]) + 1)
+        atexit.register(self.close)
+
+    @property
+    def max_workers(self) -> int:
+        return self.inner.max_workers
+
+    def now(self) -> datetime.datetime:
+        return self.inner.now()
+
+    def call(self, method: str, **kwargs) -> Any:
+        """Call the inner transport and append the response and its latency to the archive"""
+        started = time.perf_counter()
+        result = self.inner.call(method, **kwargs)
+        latency = time.perf_counter() - started
+
+        key = request_key(method, kwargs)
+        entry = {
+            'method': method,
+            'kwargs': kwargs,
+            'recorded_at': self.now().isoformat(),
+            'latency': latency,
+            'response': result,
+        }
+
+        with self._lock:
+            if self._archive is None:
+                raise RuntimeError(f"Recording archive {self.archive_path} is closed")
+            sequence = self._sequence[key]
+            self._sequence[key] += 1
+            self._archive.writestr(f"{method}/{key}/{sequence:06d}.json", json.dumps(entry, default=str))
+            self._unsaved += 1
+            if self._unsaved >= self.checkpoint_calls:
+                # Closing writes the central directory, so the archive is valid up to here
+                self._archive.close()
+                self._archive = zipfile.ZipFile(self.archive_path, 'a', compression=zipfile.ZIP_DEFLATED)
+                self._unsaved = 0
+
+        return result
+
+    def close(self):
+        """Write the archive's central directory and close it"""
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+class ReplayTransport:
+    def __init__(
+        self,
+        archive_path: str = FINNHUB_ARCHIVE,
+        realtime: bool = FINNHUB_REPLAY_REALTIME,
+        fallback: bool = FINNHUB_REPLAY_FALLBACK
+    ):
+        """
+        Transport serving responses from an archive written by RecordingTransport
+
+        Repeated identical requests get the recorded responses in order (the last
+        one repeats). Requests that were not recorded raise LookupError, unless
+        fallback is enabled.
+
+        Args:
+            archive_path: Archive to replay
+            realtime: Sleep for each response's recorded latency instead of replaying at full speed
+            fallback: Answer requests that were not recorded with the latest response
+                recorded for the same method and symbol (e.g. another date range)
+        """
+        self.archive = zipfile.ZipFile(archive_path)
+        self.realtime = realtime
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._position = defaultdict(int)
+        self._entries = defaultdict(list)  # request key -> entry names in recorded order
+        for name in sorted(self.archive.namelist()):
+            parts = name.split('/')
+            if len(parts) == 3:
+                self._entries[parts[1]].append(name)
+
+        # Secondary index for requests whose dates differ from the recording
+        self._by_symbol = {}
+        self._recorded_at = None
+        for names in self._entries.values():
+            entry = self._read(names[-1])
+            symbol = entry['kwargs'].get('symbol') or entry['kwargs'].get('exchange')
+            fallback_key = (entry['method'], symbol)
+            if fallback_key not in self._by_symbol or entry['recorded_at'] > self._by_symbol[fallback_key]['recorded_at']:
+                self._by_symbol[fallback_key] = entry
+            if self._recorded_at is None or entry['recorded_at'] < self._recorded_at:
+                self._recorded_at = entry['recorded_at']
+
+        logger.info(f"Replaying {len(self._entries)} recorded requests from {archive_path}")
+
+    @property
+    def max_workers(self) -> int:
+        # Serve one call at a time so replays are deterministic
+        return 1
+
+    def now(self) -> datetime.datetime:
+        """Time the recording started, so request date ranges match the recorded ones"""
+        if self._recorded_at is None:
+            return datetime.datetime.now()
+        return datetime.datetime.fromisoformat(self._recorded_at)
+
+    def _read(self, name: str) -> Dict[str, Any]:
+        """Read one archive entry"""
+        with self._lock:
+            return json.loads(self.archive.read(name))
+
+    def call(self, method: str, **kwargs) -> Any:
+        """
+        Serve a recorded response
+
+        Raises:
+            LookupError: If the request was not recorded (and there is no fallback)
+        """
+        key = request_key(method, kwargs)
+        names = self._entries.get(key)
+
+        if names:
+            with self._lock:
+                position = self._position[key]
+                self._position[key] += 1
+            entry = self._read(names[min(position, len(names) - 1)])
+        else:
+            symbol = kwargs.get('symbol') or kwargs.get('exchange')
+            entry = self._by_symbol.get((method, symbol)) if self.fallback else None
+            if entry is None:
+                raise LookupError(f"No recorded response for {method}({kwargs})")
+            logger.warning(f"Replaying closest recorded response for {method}({kwargs})")
+
+        if self.realtime:
+            time.sleep(entry['latency'])
+        return entry['response']
+
+def create_transport(mode: str = FINNHUB_TRANSPORT, archive_path: str = FINNHUB_ARCHIVE, key_pool: Optional[ApiKeyPool] = None):
+    """
+    Create the transport selected in config
+
+    Args:
+        mode: live, record or replay
+        archive_path: Archive used by record and replay modes
+        key_pool: Pool of API keys for live calls (defaults to the process-wide pool)
+
+    Returns:
+        Transport instance
+    """
+    if mode == 'live':
+        return LiveTransport(key_pool)
+    if mode == 'record':
+        return RecordingTransport(LiveTransport(key_pool), archive_path)
+    if mode == 'replay':
+        return ReplayTransport(archive_path)
+    raise ValueError(f"Unknown FINNHUB_TRANSPORT '{mode}' (expected live, record or replay)")
+
+# Transport shared by every FinnhubClient in the process
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+def get_shared_transport():
+    """Get (and lazily create) the process-wide transport selected in config"""
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = create_transport()
+        return _shared_transport
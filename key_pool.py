@@ -0,0 +1,185 @@
+import time
+import threading
+import logging
+from typing import List, Dict, Any, Optional, Callable
+from config import (
+    FINNHUB_CALLS_PER_MINUTE,
+    FINNHUB_BURST_SIZE,
+    FINNHUB_BACKOFF_SECONDS,
+    FINNHUB_MAX_BACKOFF_SECONDS,
+)
+
+# Set up a logger
+logger = logging.getLogger('key_pool')
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float):
+        """
+        Initialize a token bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens the bucket can hold
+            now: Current clock reading
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def refill(self, now: float):
+        """Add the tokens earned since the last refill"""
+        if now <= self.updated_at:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self, now: float) -> bool:
+        """Take one token if available"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds after `now` until one token is available"""
+        tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated_at) * self.rate)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate
+
+class ApiKey:
+    def __init__(self, key: str, bucket: TokenBucket):
+        """Rate budget and backoff state for a single API key"""
+        self.key = key
+        self.bucket = bucket
+        self.strikes = 0  # consecutive 429 responses
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+
+    def __repr__(self) -> str:
+        return f"ApiKey(...{self.key[-4:]})"
+
+class ApiKeyPool:
+    def __init__(
+        self,
+        keys: List[str],
+        calls_per_minute: int = FINNHUB_CALLS_PER_MINUTE,
+        burst_size: int = FINNHUB_BURST_SIZE,
+        backoff_seconds: float = FINNHUB_BACKOFF_SECONDS,
+        max_backoff_seconds: float = FINNHUB_MAX_BACKOFF_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize a pool of API keys, each with its own token bucket
+
+        Args:
+            keys: API keys to spread requests across
+            calls_per_minute: Rate budget of each key
+            burst_size: Calls a key may make back to back
+            backoff_seconds: Initial cooldown after a 429 response (doubles per strike)
+            max_backoff_seconds: Upper bound on the cooldown
+            clock: Monotonic clock, injectable for testing
+            sleep: Sleep function, injectable for testing
+        """
+        if not keys:
+            raise ValueError("ApiKeyPool needs at least one API key.")
+
+        self.clock = clock
+        self.sleep = sleep
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._lock = threading.Lock()
+
+        now = clock()
+        rate = calls_per_minute / 60.0
+        # Deduplicate while keeping the configured order
+        self.keys = [ApiKey(key, TokenBucket(rate, burst_size, now)) for key in dict.fromkeys(keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, timeout: Optional[float] = None) -> ApiKey:
+        """
+        Reserve one call on the key with the most budget left, waiting if every key is spent
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            The ApiKey to use for the call
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+
+        while True:
+            with self._lock:
+                now = self.clock()
+                available = [k for k in self.keys if k.cooldown_until <= now]
+                for api_key in available:
+                    api_key.bucket.refill(now)
+                available.sort(key=lambda k: k.bucket.tokens, reverse=True)
+
+                for api_key in available:
+                    if api_key.bucket.try_take(now):
+                        api_key.calls += 1
+                        return api_key
+
+                # Nothing ready: wait for the earliest token or cooldown to expire
+                wait = min(
+                    max(k.cooldown_until - now, 0.0) + k.bucket.wait_time(max(now, k.cooldown_until))
+                    for k in self.keys
+                )
+
+            if deadline is not None and self.clock() + wait > deadline:
+                raise TimeoutError("No API key became available within the timeout.")
+            self.sleep(wait)
+
+    def report_success(self, api_key: ApiKey):
+        """Clear the backoff state of a key after a successful call"""
+        with self._lock:
+            api_key.strikes = 0
+
+    def report_throttled(self, api_key: ApiKey, retry_after: Optional[float] = None):
+        """
+        Temporarily drop a key from rotation after a 429 response
+
+        Args:
+            api_key: Key that was throttled
+            retry_after: Cooldown requested by the server, if any
+        """
+        with self._lock:
+            api_key.strikes += 1
+            api_key.throttled += 1
+            cooldown = retry_after or min(
+                self.max_backoff_seconds,
+                self.backoff_seconds * (2 ** (api_key.strikes - 1))
+            )
+            api_key.cooldown_until = self.clock() + cooldown
+            # The key's budget is clearly spent; start it from empty when it returns
+            api_key.bucket.tokens = 0
+            api_key.bucket.updated_at = api_key.cooldown_until
+
+        logger.warning(f"{api_key} throttled, cooling down for {cooldown:.1f}s")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get usage statistics for every key
+
+        Returns:
+            List of dictionaries with calls, throttles and cooldown per key
+        """
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    'key': f"...{k.key[-4:]}",
+                    'calls': k.calls,
+                    'throttled': k.throttled,
+                    'cooling_down': k.cooldown_until > now,
+                    'tokens': round(k.bucket.tokens, 2),
+                }
+                for k in self.keys
+            ]
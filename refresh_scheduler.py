@@ -0,0 +1,244 @@
+import time
+import datetime
+import threading
+import logging
+from typing import List, Dict, Any, Optional
+from config import (
+    REFRESH_TIERS,
+    DEFAULT_REFRESH_TIER,
+    REFRESH_RATE_ALPHA,
+    REFRESH_BUDGET_PER_CYCLE,
+    DEFAULT_NEWS_COUNT,
+)
+
+# Set up a logger
+logger = logging.getLogger('refresh_scheduler')
+
+class TickerSchedule:
+    def __init__(self, tier: str):
+        """Learned news arrival rate and polling state for one ticker"""
+        self.tier = tier
+        self.rate = None  # articles per hour (EWMA), None until first observed
+        self.last_poll = None  # Unix time of the last poll
+        self.newest_article = 0  # publication time of the newest article seen
+
+class RefreshScheduler:
+    def __init__(
+        self,
+        client=None,
+        tiers: Dict[str, float] = REFRESH_TIERS,
+        default_tier: str = DEFAULT_REFRESH_TIER,
+        alpha: float = REFRESH_RATE_ALPHA,
+    ):
+        """
+        Decide which tickers' news to poll, spending the API budget where new articles are most likely
+
+        Each ticker's article arrival rate is learned from its get_news results.
+        A cycle first polls tickers that have outlived their tier's freshness SLA,
+        then fills the remaining budget with the tickers expected to have the
+        most new articles (rate x time since last poll).
+
+        Args:
+            client: FinnhubClient used by run_once() (created on first use)
+            tiers: Freshness SLA in seconds per tier
+            default_tier: Tier of tickers added without one
+            alpha: EWMA weight of the newest arrival-rate sample
+        """
+        if default_tier not in tiers:
+            raise ValueError(f"Unknown default refresh tier '{default_tier}'")
+        self.client = client
+        self.tiers = tiers
+        self.default_tier = default_tier
+        self.alpha = alpha
+        self._tickers: Dict[str, TickerSchedule] = {}
+        self._lock = threading.Lock()
+
+    def add(self, ticker: str, tier: Optional[str] = None):
+        """
+        Add a ticker to the schedule (or change its tier)
+
+        Args:
+            ticker: Stock symbol
+            tier: Refresh tier (None keeps the tier of a scheduled ticker, and gives
+                new tickers the default tier)
+        """
+        if tier is not None and tier not in self.tiers:
+            raise ValueError(f"Unknown refresh tier '{tier}'")
+        with self._lock:
+            if ticker not in self._tickers:
+                self._tickers[ticker] = TickerSchedule(tier or self.default_tier)
+            elif tier is not None:
+                self._tickers[ticker].tier = tier
+
+    def observe(
+        self,
+        ticker: str,
+        news_items: List[Dict[str, Any]],
+        days: int,
+        now: Optional[float] = None,
+        limit: Optional[int] = DEFAULT_NEWS_COUNT
+    ):
+        """
+        Learn a ticker's arrival rate from a get_news result
+
+        The first result estimates the rate from the articles inside the lookback
+        window, or, when the result was cut off at limit, from the time since its
+        oldest article; later results use the articles newer than any seen before.
+
+        Args:
+            ticker: Stock symbol
+            news_items: Result of FinnhubClient.get_news()
+            days: Lookback the news was fetched with
+            now: Unix time of the poll (defaults to time.time())
+            limit: Number of articles a result is cut off at (None if never)
+        """
+        now = time.time() if now is None else now
+        published = [item.get('datetime') or 0 for item in news_items]
+
+        with self._lock:
+            state = self._tickers.get(ticker)
+            if state is None:
+                state = self._tickers[ticker] = TickerSchedule(self.default_tier)
+
+            if state.last_poll is None:
+                dated = [p for p in published if p]
+                if limit is not None and len(published) >= limit and dated:
+                    # Only the newest articles were returned; they cover less than the lookback
+                    sample = len(published) / max((now - min(dated)) / 3600, 1e-6)
+                else:
+                    sample = len(published) / (days * 24)
+            else:
+                new_articles = sum(1 for p in published if p > state.newest_article)
+                sample = new_articles / max((now - state.last_poll) / 3600, 1e-6)
+
+            state.rate = sample if state.rate is None else state.rate + self.alpha * (sample - state.rate)
+            state.last_poll = now
+            state.newest_article = max([state.newest_article] + published)
+
+    def news_ttl(self, ticker: str) -> Optional[float]:
+        """
+        Lifetime of a ticker's cached news
+
+        Scheduled tickers' news never expires by age: it is refreshed when plan()
+        picks the ticker and its poll invalidates the entry, so the budget bounds
+        the news calls.
+
+        Args:
+            ticker: Stock symbol
+
+        Returns:
+            Seconds (infinite for scheduled tickers), or None for the cache's default TTL
+        """
+        with self._lock:
+            return float('inf') if ticker in self._tickers else None
+
+    def watch(self, cache):
+        """
+        Learn from every news response a TickerCache fetches, whoever requested it,
+        and let the schedule decide when the cache's news expires
+
+        Args:
+            cache: TickerCache to subscribe to
+        """
+        def on_fetch(endpoint, ticker, params, response):
+            if endpoint == 'news':
+                start_date, end_date = (datetime.date.fromisoformat(p) for p in params)
+                self.observe(ticker, response or [], max(1, (end_date - start_date).days))
+
+        cache.subscribe(on_fetch)
+        cache.set_ttl_policy('news', self.news_ttl)
+
+    def plan(
+        self,
+        budget: int = REFRESH_BUDGET_PER_CYCLE,
+        now: Optional[float] = None,
+        tickers: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Choose the tickers to poll this cycle
+
+        Args:
+            budget: Maximum number of tickers to poll
+            now: Current Unix time (defaults to time.time())
+            tickers: Only consider these scheduled tickers (None for all)
+
+        Returns:
+            Tickers to poll, most urgent first
+        """
+        now = time.time() if now is None else now
+        overdue = []
+        candidates = []
+
+        wanted = None if tickers is None else set(tickers)
+        with self._lock:
+            for ticker, state in self._tickers.items():
+                if wanted is not None and ticker not in wanted:
+                    continue
+                if state.last_poll is None:
+                    # Never polled: most urgent of all
+                    overdue.append((float('inf'), ticker))
+                    continue
+                age = now - state.last_poll
+                sla = self.tiers[state.tier]
+                if age >= sla:
+                    overdue.append((age / sla, ticker))
+                else:
+                    candidates.append((state.rate * age / 3600, ticker))
+
+        overdue.sort(key=lambda x: x[0], reverse=True)
+        candidates.sort(key=lambda x: x[0], reverse=True)
+        if len(overdue) > budget:
+            logger.warning(f"{len(overdue) - budget} tickers will miss their freshness SLA this cycle")
+
+        plan = [ticker for _, ticker in overdue[:budget]]
+        plan += [ticker for expected, ticker in candidates[:budget - len(plan)] if expected > 0]
+        return plan
+
+    def run_once(self, budget: int = REFRESH_BUDGET_PER_CYCLE, days: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Poll the planned tickers' news and learn from the results
+
+        Args:
+            budget: Maximum number of news calls
+            days: Lookback of each news call
+
+        Returns:
+            Dictionary of news per polled ticker
+        """
+        if self.client is None:
+            from finnhub_client import FinnhubClient
+            self.client = FinnhubClient()
+
+        tickers = self.plan(budget)
+        # The plan decided these are worth a call; skip the response cache
+        self.client.cache.invalidate(tickers, endpoints=["news"], hard=True)
+
+        results = {}
+        for ticker in tickers:
+            results[ticker] = self.client.get_news(ticker, days)
+            self.observe(ticker, results[ticker], days)
+
+        logger.info(f"Polled {len(tickers)} of {len(self._tickers)} tickers")
+        return results
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the schedule of every ticker
+
+        Returns:
+            List of dictionaries with tier, learned rate and seconds since the last poll
+        """
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    'ticker': ticker,
+                    'tier': state.tier,
+                    'articles_per_hour': state.rate,
+                    'age': None if state.last_poll is None else now - state.last_poll,
+                }
+                for ticker, state in self._tickers.items()
+            ]
+
+# Scheduler shared by every dashboard session, learning from every news fetch in the process
+shared_scheduler = RefreshScheduler()
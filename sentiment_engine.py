@@ -1,9 +1,13 @@
+import io
+import time
 import nltk
+import datetime
+import numpy as np
 import pandas as pd
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from config import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+from config import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD, MAX_LOOKBACK_DAYS
 
 # Set up a logger
 logger = logging.getLogger('sentiment_engine')
@@ -15,6 +19,153 @@ except LookupError:
     logger.info("Downloading VADER lexicon (first-time setup)")
     nltk.download('vader_lexicon')
 
+# Order of the per-day classification counts in SentimentBuckets
+SENTIMENT_LABELS = ["positive", "negative", "neutral"]
+
+class SentimentBuckets:
+    def __init__(self, info: pd.DataFrame, score_sums: np.ndarray, counts: np.ndarray, as_of: datetime.date):
+        """
+        Per-ticker, per-day sentiment aggregates answering any lookback from prefix sums
+
+        Day 0 is `as_of`, day d is d days earlier.
+
+        Args:
+            info: One row per ticker with name, sector, quote and fetched_at (Unix time) columns
+            score_sums: Sum of article scores, shape (tickers, days)
+            counts: Articles per classification (SENTIMENT_LABELS order), shape (tickers, days, 3)
+            as_of: Date of day 0
+        """
+        self.info = info.reset_index(drop=True)
+        self.as_of = as_of
+        self.score_sums = score_sums
+        self.counts = counts
+        self.score_cumsum = np.cumsum(score_sums, axis=1)
+        self.count_cumsum = np.cumsum(counts, axis=1)
+
+    @property
+    def tickers(self) -> List[str]:
+        """Tickers in row order"""
+        return self.info['ticker'].tolist()
+
+    def subset(self, tickers: List[str]) -> 'SentimentBuckets':
+        """
+        Get the buckets of some tickers, in the given order
+
+        Args:
+            tickers: Tickers to keep (tickers without buckets are skipped)
+
+        Returns:
+            SentimentBuckets for the tickers
+        """
+        rows = {ticker: i for i, ticker in enumerate(self.tickers)}
+        index = [rows[t] for t in tickers if t in rows]
+        return SentimentBuckets(self.info.iloc[index], self.score_sums[index], self.counts[index], self.as_of)
+
+    def aligned_to(self, as_of: datetime.date) -> 'SentimentBuckets':
+        """
+        Re-anchor the buckets at a later day 0, dropping days beyond the horizon
+
+        Args:
+            as_of: New date of day 0
+
+        Returns:
+            SentimentBuckets with the same horizon anchored at as_of
+        """
+        shift = (as_of - self.as_of).days
+        if shift <= 0:
+            return self
+
+        score_sums = np.zeros_like(self.score_sums)
+        counts = np.zeros_like(self.counts)
+        if shift < score_sums.shape[1]:
+            score_sums[:, shift:] = self.score_sums[:, :-shift]
+            counts[:, shift:] = self.counts[:, :-shift]
+        return SentimentBuckets(self.info, score_sums, counts, as_of)
+
+    @classmethod
+    def concat(cls, parts: List['SentimentBuckets']) -> 'SentimentBuckets':
+        """
+        Stack the buckets of several batches, anchored at the latest day 0
+
+        Args:
+            parts: Buckets to combine (must share a horizon)
+
+        Returns:
+            Combined SentimentBuckets
+        """
+        as_of = max(part.as_of for part in parts)
+        parts = [part.aligned_to(as_of) for part in parts]
+        return cls(
+            pd.concat([part.info for part in parts], ignore_index=True),
+            np.concatenate([part.score_sums for part in parts]),
+            np.concatenate([part.counts for part in parts]),
+            as_of
+        )
+
+    def save(self, path: str):
+        """Save the buckets to a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            info=self.info.to_json(orient='split'),
+            score_sums=self.score_sums,
+            counts=self.counts,
+            as_of=self.as_of.isoformat()
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'SentimentBuckets':
+        """Load buckets saved with save()"""
+        with np.load(path, allow_pickle=False) as data:
+            info = pd.read_json(io.StringIO(str(data['info'])), orient='split', dtype=False, convert_dates=False)
+            return cls(
+                info,
+                data['score_sums'],
+                data['counts'],
+                datetime.date.fromisoformat(str(data['as_of']))
+            )
+
+    @property
+    def horizon_days(self) -> int:
+        """Longest lookback the buckets can answer"""
+        return self.score_cumsum.shape[1] - 1
+
+    def window(self, days: int) -> pd.DataFrame:
+        """
+        Aggregate sentiment over a lookback window in O(tickers)
+
+        Args:
+            days: Number of days to look back (capped at the stored horizon)
+
+        Returns:
+            DataFrame with the same columns as SentimentEngine.process_batch_data()
+        """
+        index = max(0, min(days, self.horizon_days))
+        score_sums = self.score_cumsum[:, index]
+        counts = self.count_cumsum[:, index, :]
+        total = counts.sum(axis=1)
+
+        avg_scores = np.divide(score_sums, total, out=np.zeros_like(score_sums), where=total > 0)
+        sentiments = np.select(
+            [avg_scores >= POSITIVE_THRESHOLD, avg_scores <= NEGATIVE_THRESHOLD],
+            ["positive", "negative"],
+            default="neutral"
+        )
+
+        return pd.DataFrame({
+            'ticker': self.info['ticker'],
+            'name': self.info['name'],
+            'sector': self.info['sector'],
+            'sentiment_score': avg_scores,
+            'sentiment': sentiments,
+            'mentions': total,
+            'positive_mentions': counts[:, 0],
+            'negative_mentions': counts[:, 1],
+            'neutral_mentions': counts[:, 2],
+            'current_price': self.info['current_price'],
+            'price_change': self.info['price_change'],
+            'price_change_pct': self.info['price_change_pct'],
+        })
+
 class SentimentEngine:
     def __init__(self):
         """Initialize the VADER sentiment analyzer"""
@@ -53,6 +204,27 @@ class SentimentEngine:
         else:
             return "neutral"
     
+    def score_article(self, item: Dict[str, Any]) -> float:
+        """
+        Score a single news item from its headline and summary
+
+        Args:
+            item: News dictionary (from Finnhub)
+
+        Returns:
+            Combined sentiment score (-1 to 1)
+        """
+        # Get headline and summary
+        headline = item.get('headline', '')
+        summary = item.get('summary', '')
+        
+        # Score headline (more weight) and summary
+        headline_score = self.score_text(headline) * 1.5  # More weight to headline
+        summary_score = self.score_text(summary) 
+        
+        # Average the scores (with headline having more weight)
+        return (headline_score + summary_score) / 2.5
+    
     def analyze_news(self, news_items: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Analyze a list of news items
@@ -77,16 +249,7 @@ class SentimentEngine:
         sentiments = []
         
         for item in news_items:
-            # Get headline and summary
-            headline = item.get('headline', '')
-            summary = item.get('summary', '')
-            
-            # Score headline (more weight) and summary
-            headline_score = self.score_text(headline) * 1.5  # More weight to headline
-            summary_score = self.score_text(summary) 
-            
-            # Average the scores (with headline having more weight)
-            combined_score = (headline_score + summary_score) / 2.5
+            combined_score = self.score_article(item)
             scores.append(combined_score)
             
             sentiment = self.classify_sentiment(combined_score)
@@ -122,24 +285,90 @@ class SentimentEngine:
         
         for ticker, data in batch_data.items():
             news = data.get('news', [])
-            profile = data.get('profile', {})
-            quote = data.get('quote', {})
+            info = self._ticker_info(ticker, data)
             
             sentiment_data = self.analyze_news(news)
             
             results.append({
-                'ticker': ticker,
-                'name': profile.get('name', ticker),
-                'sector': profile.get('finnhubIndustry', 'Unknown'),
+                'ticker': info['ticker'],
+                'name': info['name'],
+                'sector': info['sector'],
                 'sentiment_score': sentiment_data['avg_score'],
                 'sentiment': sentiment_data['sentiment'],
                 'mentions': sentiment_data['count'],
                 'positive_mentions': sentiment_data['positive_count'],
                 'negative_mentions': sentiment_data['negative_count'],
                 'neutral_mentions': sentiment_data['neutral_count'],
-                'current_price': quote.get('c', 0),
-                'price_change': quote.get('d', 0),
-                'price_change_pct': quote.get('dp', 0),
+                'current_price': info['current_price'],
+                'price_change': info['price_change'],
+                'price_change_pct': info['price_change_pct'],
             })
         
-        return pd.DataFrame(results) 
\ No newline at end of file
+        return pd.DataFrame(results)
+    
+    def _ticker_info(self, ticker: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the name, sector and quote fields of a ticker's batch data"""
+        profile = data.get('profile', {})
+        quote = data.get('quote', {})
+        
+        return {
+            'ticker': ticker,
+            'name': profile.get('name', ticker),
+            'sector': profile.get('finnhubIndustry', 'Unknown'),
+            'current_price': quote.get('c', 0),
+            'price_change': quote.get('d', 0),
+            'price_change_pct': quote.get('dp', 0),
+        }
+    
+    def build_daily_buckets(
+        self,
+        batch_data: Dict[str, Dict[str, Any]],
+        horizon_days: int = MAX_LOOKBACK_DAYS,
+        as_of: Optional[datetime.date] = None,
+        fetched_at: Optional[float] = None
+    ) -> SentimentBuckets:
+        """
+        Score batch data once into per-day buckets so any lookback up to the horizon
+        can be answered without refetching or rescoring
+        
+        Args:
+            batch_data: Dictionary of ticker data from FinnhubClient.get_batch_data(),
+                fetched with a lookback of horizon_days
+            horizon_days: Longest lookback the buckets should answer
+            as_of: Date counted as day 0 (defaults to today)
+            fetched_at: Unix time the batch was fetched (defaults to now)
+            
+        Returns:
+            SentimentBuckets for the batch
+        """
+        as_of = as_of or datetime.date.today()
+        score_sums = np.zeros((len(batch_data), horizon_days + 1))
+        counts = np.zeros((len(batch_data), horizon_days + 1, len(SENTIMENT_LABELS)), dtype=np.int64)
+        infos = []
+        
+        for i, (ticker, data) in enumerate(batch_data.items()):
+            infos.append(self._ticker_info(ticker, data))
+            
+            for item in data.get('news', []):
+                offset = self._day_offset(item, as_of)
+                if offset > horizon_days:
+                    continue
+                
+                score = self.score_article(item)
+                score_sums[i, offset] += score
+                counts[i, offset, SENTIMENT_LABELS.index(self.classify_sentiment(score))] += 1
+        
+        info = pd.DataFrame(infos, columns=[
+            'ticker', 'name', 'sector', 'current_price', 'price_change', 'price_change_pct'
+        ])
+        info['fetched_at'] = time.time() if fetched_at is None else fetched_at
+        return SentimentBuckets(info, score_sums, counts, as_of)
+    
+    def _day_offset(self, item: Dict[str, Any], as_of: datetime.date) -> int:
+        """Days between a news item's publication date and as_of (items without a date count as day 0)"""
+        timestamp = item.get('datetime')
+        if not timestamp:
+            return 0
+        
+        published = datetime.datetime.fromtimestamp(timestamp).date()
+        return max(0, (as_of - published).days) 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+# Set up a logger
+logger = logging.getLogger('single_flight')
+
+class _InFlightCall:
+    def __init__(self):
+        """A call in progress that other callers can wait on"""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        """Initialize a single-flight group with empty counters"""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _InFlightCall] = {}
+        self.calls = 0  # total calls to do()
+        self.executed = 0  # calls that actually ran the function
+        self.coalesced = 0  # calls that waited on another caller's result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers asking for the same key
+
+        The first caller runs fn; callers arriving while it is in flight wait
+        for it and share its result (or its exception).
+
+        Args:
+            key: Identity of the request (e.g. endpoint and ticker)
+            fn: Function performing the request
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.executed += 1
+                call = _InFlightCall()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            logger.debug(f"Coalesced request for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get request coalescing counters
+
+        Returns:
+            Dictionary with total, executed, coalesced and in-flight call counts
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
+
+# Process-wide group shared by every FinnhubClient (and so every dashboard session)
+shared_flight = SingleFlight()
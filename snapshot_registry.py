@@ -0,0 +1,159 @@
+import weakref
+import hashlib
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Optional
+from config import SNAPSHOT_REGISTRY_MAX_SNAPSHOTS
+from sentiment_engine import SentimentBuckets
+
+# Set up a logger
+logger = logging.getLogger('snapshot_registry')
+
+def snapshot_id(buckets: SentimentBuckets) -> str:
+    """
+    Content-based id of a set of buckets
+
+    fetched_at is left out, so sessions that load the same universe from the
+    shared response cache end up with the same id.
+
+    Args:
+        buckets: Per-day sentiment buckets
+
+    Returns:
+        Hex digest identifying the buckets
+    """
+    digest = hashlib.sha1()
+    digest.update(buckets.info.drop(columns=['fetched_at'], errors='ignore').to_json(orient='split').encode('utf-8'))
+    digest.update(buckets.as_of.isoformat().encode('utf-8'))
+    digest.update(np.ascontiguousarray(buckets.score_sums).tobytes())
+    digest.update(np.ascontiguousarray(buckets.counts).tobytes())
+    return digest.hexdigest()[:20]
+
+def _freeze(buckets: SentimentBuckets):
+    """Make the buckets' arrays read-only, so no session can change a shared snapshot"""
+    for array in (buckets.score_sums, buckets.counts, buckets.score_cumsum, buckets.count_cumsum):
+        array.setflags(write=False)
+
+class Snapshot:
+    def __init__(self, key: str, buckets: SentimentBuckets):
+        """
+        Read-only buckets shared by sessions, with the sentiment table of each lookback computed once
+
+        Args:
+            key: Snapshot id
+            buckets: Frozen per-day sentiment buckets
+        """
+        self.id = key
+        self.buckets = buckets
+        self._windows: Dict[int, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def window(self, days: int) -> pd.DataFrame:
+        """
+        Get the sentiment table for a lookback (see SentimentBuckets.window())
+
+        Returns:
+            Shared DataFrame that must not be modified
+        """
+        with self._lock:
+            df = self._windows.get(days)
+        if df is None:
+            df = self.buckets.window(days)
+            with self._lock:
+                df = self._windows.setdefault(days, df)
+        return df
+
+    def nbytes(self) -> int:
+        """Memory used by the buckets and the computed tables"""
+        b = self.buckets
+        with self._lock:
+            windows = list(self._windows.values())
+        return (
+            b.score_sums.nbytes + b.counts.nbytes + b.score_cumsum.nbytes + b.count_cumsum.nbytes
+            + sum(int(df.memory_usage(deep=True).sum()) for df in windows)
+        )
+
+class SnapshotRegistry:
+    def __init__(self, max_snapshots: int = SNAPSHOT_REGISTRY_MAX_SNAPSHOTS):
+        """
+        Process-wide store of read-only sentiment snapshots shared by all dashboard sessions
+
+        Identical buckets are published once, however many sessions load them.
+        Sessions keep a reference to their Snapshot (a pointer, not a copy), which
+        pins it: a snapshot is only released once no session references it and it
+        is not among the max_snapshots most recently used.
+
+        Args:
+            max_snapshots: Unreferenced snapshots kept for reuse, least recently used first out
+        """
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._recent: OrderedDict = OrderedDict()
+        self._live = weakref.WeakValueDictionary()  # every snapshot still referenced anywhere
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def publish(self, buckets: SentimentBuckets) -> Snapshot:
+        """
+        Add buckets to the registry (or reuse an identical snapshot)
+
+        Args:
+            buckets: Per-day sentiment buckets; they are frozen and must not be modified afterwards
+
+        Returns:
+            The shared Snapshot
+        """
+        key = snapshot_id(buckets)
+        with self._lock:
+            snapshot = self._live.get(key)
+            if snapshot is None:
+                _freeze(buckets)
+                snapshot = self._live[key] = Snapshot(key, buckets)
+            self._remember(snapshot)
+        return snapshot
+
+    def get(self, key: str) -> Optional[Snapshot]:
+        """
+        Get a snapshot by id
+
+        Args:
+            key: Snapshot id
+
+        Returns:
+            The shared Snapshot, or None if it was released
+        """
+        with self._lock:
+            snapshot = self._live.get(key)
+            if snapshot is not None:
+                self._remember(snapshot)
+            return snapshot
+
+    def _remember(self, snapshot: Snapshot):
+        """Mark a snapshot as most recently used (caller holds the lock)"""
+        self._recent[snapshot.id] = snapshot
+        self._recent.move_to_end(snapshot.id)
+        while len(self._recent) > self.max_snapshots:
+            self._recent.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get registry statistics
+
+        Returns:
+            Dictionary with the number of live snapshots, recently used ones and their memory in bytes
+        """
+        with self._lock:
+            snapshots = list(self._live.values())
+            recent = len(self._recent)
+        return {
+            'snapshots': len(snapshots),
+            'recent': recent,
+            'bytes': sum(snapshot.nbytes() for snapshot in snapshots),
+        }
+
+# Registry shared by every dashboard session in the process
+shared_registry = SnapshotRegistry()
@@ -0,0 +1,189 @@
+import os
+import glob
+import time
+import datetime
+import tempfile
+import threading
+import logging
+import pandas as pd
+from typing import List, Optional, Callable
+from config import (
+    SNAPSHOT_DIR,
+    SNAPSHOT_MAX_FILES,
+    MAX_LOOKBACK_DAYS,
+    API_LOOKBACK_DAYS,
+    LATEST_SNAPSHOT_FILE,
+    WARM_START_MAX_AGE_SECONDS,
+    WARM_START_MAX_FILES,
+)
+from sentiment_engine import SentimentBuckets
+
+# Set up a logger
+logger = logging.getLogger('snapshot_store')
+
+SNAPSHOT_PATTERNS = ['sentiment_data_*.csv', 'sentiment_buckets_*.npz']
+
+# Serializes choosing snapshot names and updating the latest table, so concurrent saves never collide
+_save_lock = threading.Lock()
+
+def _write_temp(directory: str, suffix: str, write: Callable[[str], None]) -> str:
+    """Write a file under a unique temporary name in directory and return its path"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def prune_snapshots(directory: str = SNAPSHOT_DIR, max_files: int = SNAPSHOT_MAX_FILES):
+    """
+    Delete all but the newest snapshot files of each kind
+
+    Args:
+        directory: Directory containing the snapshots
+        max_files: Files of each kind to keep
+    """
+    for pattern in SNAPSHOT_PATTERNS:
+        paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        for path in paths[:max(0, len(paths) - max_files)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already deleted by a concurrent save
+            except OSError as e:
+                logger.error(f"Error deleting old snapshot {path}: {e}")
+
+def _update_latest_table(buckets: SentimentBuckets, directory: str):
+    """Merge buckets into the latest table, keeping the most recently fetched row per ticker (caller holds _save_lock)"""
+    rows = buckets.window(API_LOOKBACK_DAYS)
+    rows['fetched_at'] = buckets.info['fetched_at'].to_numpy()
+
+    path = os.path.join(directory, LATEST_SNAPSHOT_FILE)
+    if os.path.exists(path):
+        try:
+            rows = pd.concat([pd.read_csv(path), rows], ignore_index=True)
+        except Exception as e:
+            logger.error(f"Replacing unreadable latest table {path}: {e}")
+
+    latest = (
+        rows.sort_values('fetched_at', kind='stable')
+        .drop_duplicates('ticker', keep='last')
+        .sort_values('ticker')
+    )
+    tmp_path = _write_temp(directory, '.csv', lambda p: latest.to_csv(p, index=False))
+    os.replace(tmp_path, path)
+
+def save_snapshot(
+    buckets: SentimentBuckets,
+    days: int,
+    snapshot_time: Optional[datetime.datetime] = None,
+    directory: str = SNAPSHOT_DIR
+) -> pd.DataFrame:
+    """
+    Save a snapshot: the sentiment table for one lookback as CSV, and the per-day buckets
+
+    The snapshot's rows also replace its tickers' rows in the latest table.
+
+    Args:
+        buckets: Per-day sentiment buckets
+        days: Lookback of the saved sentiment table
+        snapshot_time: Time of the snapshot (defaults to now)
+        directory: Directory to save into
+
+    Returns:
+        The saved sentiment table
+    """
+    snapshot_time = snapshot_time or datetime.datetime.now()
+
+    snapshot_df = buckets.window(days)
+    # Write under temporary names then rename, so readers never see a partial file
+    tmp_csv = _write_temp(directory, '.csv', lambda path: snapshot_df.to_csv(path, index=False))
+    tmp_npz = _write_temp(directory, '.npz', buckets.save)
+
+    with _save_lock:
+        # Names sort in time order; saves within the same microsecond get the next one
+        while True:
+            timestamp = snapshot_time.strftime('%Y%m%d_%H%M%S_%f')
+            csv_path = os.path.join(directory, f'sentiment_data_{timestamp}.csv')
+            npz_path = os.path.join(directory, f'sentiment_buckets_{timestamp}.npz')
+            if not os.path.exists(csv_path) and not os.path.exists(npz_path):
+                break
+            snapshot_time += datetime.timedelta(microseconds=1)
+        os.replace(tmp_csv, csv_path)
+        os.replace(tmp_npz, npz_path)
+        _update_latest_table(buckets, directory)
+
+    prune_snapshots(directory)
+    return snapshot_df
+
+def load_latest_buckets(
+    tickers: List[str],
+    directory: str = SNAPSHOT_DIR,
+    max_files: int = WARM_START_MAX_FILES,
+    horizon_days: int = MAX_LOOKBACK_DAYS
+) -> Optional[SentimentBuckets]:
+    """
+    Load the most recently saved buckets of each requested ticker
+
+    Bucket files are searched newest first and the search stops as soon as
+    every ticker has been found.
+
+    Args:
+        tickers: Tickers to load
+        directory: Directory containing the snapshots
+        max_files: Maximum number of bucket files to search
+        horizon_days: Horizon of the buckets to load; files saved with another horizon are skipped
+
+    Returns:
+        SentimentBuckets for the tickers found (in the requested order), or None if none were found
+    """
+    missing = list(dict.fromkeys(tickers))
+    parts = []
+
+    paths = sorted(glob.glob(os.path.join(directory, 'sentiment_buckets_*.npz')), reverse=True)
+    for path in paths[:max_files]:
+        if not missing:
+            break
+        try:
+            buckets = SentimentBuckets.load(path)
+        except Exception as e:
+            logger.error(f"Skipping snapshot {path}: {e}")
+            continue
+        if buckets.horizon_days != horizon_days:
+            logger.info(f"Skipping snapshot {path}: horizon of {buckets.horizon_days} days instead of {horizon_days}")
+            continue
+
+        found = [t for t in missing if t in set(buckets.tickers)]
+        if found:
+            parts.append(buckets.subset(found))
+            missing = [t for t in missing if t not in found]
+
+    if not parts:
+        return None
+
+    logger.info(f"Warm start: loaded {len(tickers) - len(missing)} of {len(tickers)} tickers from {len(parts)} snapshots")
+    return SentimentBuckets.concat(parts).subset(tickers)
+
+def stale_tickers(
+    buckets: Optional[SentimentBuckets],
+    tickers: List[str],
+    max_age: float = WARM_START_MAX_AGE_SECONDS,
+    now: Optional[float] = None
+) -> List[str]:
+    """
+    Get the tickers whose buckets are missing or older than max_age
+
+    Args:
+        buckets: Loaded buckets (None if nothing was loaded)
+        tickers: Requested tickers
+        max_age: Maximum age in seconds of fresh data
+        now: Current Unix time (defaults to time.time())
+
+    Returns:
+        List of stale tickers, in the requested order
+    """
+    now = time.time() if now is None else now
+    fetched_at = {} if buckets is None else dict(zip(buckets.info['ticker'], buckets.info['fetched_at']))
+    return [t for t in tickers if now - fetched_at.get(t, 0) > max_age]
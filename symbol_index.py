@@ -0,0 +1,210 @@
+import os
+import gzip
+import json
+import time
+import bisect
+import threading
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from config import SNAPSHOT_DIR, SYMBOL_EXCHANGE, SYMBOL_INDEX_MAX_AGE_SECONDS
+
+# Set up a logger
+logger = logging.getLogger('symbol_index')
+
+class SymbolIndex:
+    def __init__(self, records: List[Dict[str, Any]], built_at: Optional[float] = None):
+        """
+        Sorted index of listed symbols for O(log n) validation and prefix search
+
+        Args:
+            records: Symbol dictionaries from FinnhubClient.get_stock_symbols()
+            built_at: Unix time the listing was fetched (defaults to now)
+        """
+        records = sorted(
+            (r for r in records if r.get('symbol')),
+            key=lambda r: r['symbol'].upper()
+        )
+        self.built_at = time.time() if built_at is None else built_at
+        self.symbols = [r['symbol'].upper() for r in records]
+        self.descriptions = [r.get('description', '') for r in records]
+        self.types = [r.get('type', '') for r in records]
+        self.mics = [r.get('mic', '') for r in records]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        symbol = symbol.upper()
+        i = bisect.bisect_left(self.symbols, symbol)
+        return i < len(self.symbols) and self.symbols[i] == symbol
+
+    def validate(self, tickers: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split tickers into listed and unknown symbols
+
+        Args:
+            tickers: Stock symbols
+
+        Returns:
+            Tuple of (valid, invalid) tickers, in the given order
+        """
+        valid = [t for t in tickers if t in self]
+        invalid = [t for t in tickers if t not in self]
+        return valid, invalid
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """
+        Get the symbols starting with a prefix
+
+        Args:
+            prefix: Beginning of a symbol
+            limit: Maximum number of matches
+
+        Returns:
+            List of (symbol, description) tuples in symbol order
+        """
+        prefix = prefix.strip().upper()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.symbols, prefix)
+        end = min(bisect.bisect_left(self.symbols, prefix + '\uffff'), start + limit)
+        return [(self.symbols[i], self.descriptions[i]) for i in range(start, end)]
+
+    def exchanges(self) -> List[str]:
+        """Market identifier codes (MICs) present in the listing"""
+        return sorted(set(m for m in self.mics if m))
+
+    def security_types(self) -> List[str]:
+        """Security types present in the listing"""
+        return sorted(set(t for t in self.types if t))
+
+    def expand(self, mic: Optional[str] = None, security_type: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Get the symbols listed on an exchange and/or of a security type
+
+        Args:
+            mic: Market identifier code (e.g. XNAS), None for any
+            security_type: Security type (e.g. Common Stock), None for any
+            limit: Maximum number of symbols
+
+        Returns:
+            List of symbols in symbol order
+        """
+        symbols = [
+            symbol for symbol, m, t in zip(self.symbols, self.mics, self.types)
+            if (mic is None or m == mic) and (security_type is None or t == security_type)
+        ]
+        return symbols[:limit] if limit is not None else symbols
+
+    def save(self, path: str):
+        """Save the index as gzipped JSON"""
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                'built_at': self.built_at,
+                'columns': ['symbol', 'description', 'type', 'mic'],
+                'rows': list(zip(self.symbols, self.descriptions, self.types, self.mics)),
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'SymbolIndex':
+        """Load an index saved with save()"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        records = [dict(zip(data['columns'], row)) for row in data['rows']]
+        return cls(records, data['built_at'])
+
+def symbol_index_path(exchange: str = SYMBOL_EXCHANGE, directory: str = SNAPSHOT_DIR) -> str:
+    """Path of the cached symbol index of an exchange"""
+    return os.path.join(directory, f'symbols_{exchange}.json.gz')
+
+def load_symbol_index(
+    exchange: str = SYMBOL_EXCHANGE,
+    directory: str = SNAPSHOT_DIR,
+    max_age: float = SYMBOL_INDEX_MAX_AGE_SECONDS,
+    client=None
+) -> Optional[SymbolIndex]:
+    """
+    Load the cached symbol index, rebuilding it from Finnhub when missing or older than max_age
+
+    Args:
+        exchange: Exchange code of the listing
+        directory: Directory of the cached index
+        max_age: Maximum age in seconds before the listing is refetched
+        client: FinnhubClient to fetch with (created if needed)
+
+    Returns:
+        SymbolIndex, or None if there is no cached index and the listing could not be fetched
+    """
+    path = symbol_index_path(exchange, directory)
+
+    cached = None
+    if os.path.exists(path):
+        try:
+            cached = SymbolIndex.load(path)
+        except Exception as e:
+            logger.error(f"Error loading symbol index {path}: {e}")
+
+    if cached is not None and time.time() - cached.built_at <= max_age:
+        return cached
+
+    if client is None:
+        from finnhub_client import FinnhubClient
+        client = FinnhubClient()
+
+    records = client.get_stock_symbols(exchange)
+    if not records:
+        # Keep using an outdated index rather than none at all
+        return cached
+
+    index = SymbolIndex(records)
+    index.save(path)
+    logger.info(f"Built symbol index for {exchange} with {len(index)} symbols")
+    return index
+
+# Index shared by every dashboard session, loaded on first use
+_shared_index = None
+_shared_index_loaded = False
+_shared_index_refreshing = False
+_shared_index_checked_at = 0.0
+_shared_index_lock = threading.Lock()
+_RETRY_SECONDS = 600  # wait between attempts when the listing cannot be fetched
+
+def _refresh_shared_index():
+    """Background task fetching the listing into the shared index"""
+    global _shared_index, _shared_index_refreshing
+    try:
+        index = load_symbol_index()
+    except Exception as e:
+        logger.error(f"Error loading symbol index: {e}")
+        index = None
+    with _shared_index_lock:
+        if index is not None:
+            _shared_index = index
+        _shared_index_refreshing = False
+
+def get_shared_symbol_index() -> Optional[SymbolIndex]:
+    """
+    Get the process-wide symbol index without waiting for the network
+
+    The cached index is read from disk on first use. A missing or outdated
+    listing is fetched in a background thread; until it arrives this returns
+    the outdated index, or None if there is none.
+    """
+    global _shared_index, _shared_index_loaded, _shared_index_refreshing, _shared_index_checked_at
+    with _shared_index_lock:
+        if not _shared_index_loaded:
+            _shared_index_loaded = True
+            path = symbol_index_path()
+            if os.path.exists(path):
+                try:
+                    _shared_index = SymbolIndex.load(path)
+                except Exception as e:
+                    logger.error(f"Error loading symbol index {path}: {e}")
+
+        now = time.time()
+        outdated = _shared_index is None or now - _shared_index.built_at > SYMBOL_INDEX_MAX_AGE_SECONDS
+        if outdated and not _shared_index_refreshing and now - _shared_index_checked_at > _RETRY_SECONDS:
+            _shared_index_checked_at = now
+            _shared_index_refreshing = True
+            threading.Thread(target=_refresh_shared_index, name='symbol-index-refresh', daemon=True).start()
+        return _shared_index
@@ -0,0 +1,80 @@
+import datetime
+import pytest
+from finnhub_client import FinnhubClient
+from finnhub_transport import RecordingTransport, ReplayTransport
+from single_flight import SingleFlight
+from ticker_cache import TickerCache
+
+RECORDED_AT = datetime.datetime(2025, 4, 4, 19, 30)
+TICKERS = ["AAPL", "MSFT", "NVDA"]
+
+class FakeLiveTransport:
+    """Stands in for LiveTransport with deterministic responses, so recording needs no API key"""
+    max_workers = 2
+
+    def __init__(self):
+        self.calls = 0
+
+    def now(self) -> datetime.datetime:
+        return RECORDED_AT
+
+    def call(self, method, **kwargs):
+        self.calls += 1
+        symbol = kwargs.get('symbol')
+        if method == 'company_profile2':
+            return {'name': f"{symbol} Inc.", 'finnhubIndustry': "Technology"}
+        if method == 'quote':
+            return {'c': 100.0 + len(symbol), 'd': 1.5, 'dp': 1.2}
+        if method == 'company_news':
+            published = int(RECORDED_AT.timestamp())
+            return [
+                {'id': i, 'datetime': published - i * 7200, 'headline': f"{symbol} headline {i}", 'summary': ""}
+                for i in range(len(symbol) * 3)
+            ]
+        raise ValueError(f"Unexpected method {method}")
+
+def client_for(transport) -> FinnhubClient:
+    """Client with its own cache and single-flight group, so runs don't share responses"""
+    return FinnhubClient(transport=transport, flight=SingleFlight(), cache=TickerCache())
+
+@pytest.fixture
+def archive(tmp_path):
+    """Archive recorded from one pipeline run, and that run's batch data"""
+    path = str(tmp_path / "archive.zip")
+    recorder = RecordingTransport(FakeLiveTransport(), path)
+    batch_data = client_for(recorder).get_batch_data(TICKERS, 30)
+    recorder.close()
+    return path, batch_data
+
+def test_replay_reproduces_recorded_batch(archive):
+    path, recorded = archive
+    replay = ReplayTransport(path)
+
+    assert replay.now() == RECORDED_AT
+    assert client_for(replay).get_batch_data(TICKERS, 30) == recorded
+
+def test_replay_buckets_match_recording(archive):
+    path, recorded = archive
+    try:
+        from sentiment_engine import SentimentEngine
+        engine = SentimentEngine()
+    except LookupError:
+        pytest.skip("VADER lexicon not available")
+
+    replay = ReplayTransport(path)
+    as_of = replay.now().date()
+    expected = engine.build_daily_buckets(recorded, 30, as_of=as_of, fetched_at=0).window(7)
+    replayed = engine.build_daily_buckets(client_for(replay).get_batch_data(TICKERS, 30), 30, as_of=as_of, fetched_at=0)
+
+    assert replayed.window(7).equals(expected)
+
+def test_unrecorded_request_fails_without_fallback(archive):
+    path, _ = archive
+
+    with pytest.raises(LookupError):
+        ReplayTransport(path).call('company_news', symbol="AAPL", _from="2025-03-28", to="2025-04-04")
+
+    recorded_news = ReplayTransport(path, fallback=True).call(
+        'company_news', symbol="AAPL", _from="2025-03-28", to="2025-04-04"
+    )
+    assert len(recorded_news) == 12
@@ -0,0 +1,83 @@
+import pytest
+from key_pool import ApiKeyPool
+
+class FakeClock:
+    """Clock that only moves when the pool sleeps (or the test advances it)"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_pool(keys, clock, **kwargs) -> ApiKeyPool:
+    kwargs.setdefault('calls_per_minute', 60)
+    kwargs.setdefault('burst_size', 2)
+    return ApiKeyPool(keys, clock=clock, sleep=clock.sleep, **kwargs)
+
+def test_calls_rotate_across_keys():
+    clock = FakeClock()
+    pool = make_pool(["key-aaaa", "key-bbbb"], clock)
+
+    used = [pool.acquire().key for _ in range(4)]
+
+    assert used == ["key-aaaa", "key-bbbb", "key-aaaa", "key-bbbb"]
+    assert clock.sleeps == []
+
+def test_waits_for_a_token_when_every_key_is_spent():
+    clock = FakeClock()
+    pool = make_pool(["key-aaaa", "key-bbbb"], clock)
+    for _ in range(4):
+        pool.acquire()
+
+    pool.acquire()
+
+    # 60 calls per minute: the next token arrives after one second
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+def test_acquire_times_out():
+    clock = FakeClock()
+    pool = make_pool(["key-aaaa"], clock, burst_size=1)
+    pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.5)
+
+def test_throttled_key_cools_down_with_exponential_backoff():
+    clock = FakeClock()
+    pool = make_pool(["key-aaaa", "key-bbbb"], clock, burst_size=10, backoff_seconds=5.0)
+    throttled = pool.acquire()
+    assert throttled.key == "key-aaaa"
+
+    pool.report_throttled(throttled)
+    assert [pool.acquire().key for _ in range(3)] == ["key-bbbb"] * 3
+
+    # Back in rotation after the cooldown, starting from an empty budget
+    clock.now += 5.0
+    assert pool.acquire().key == "key-bbbb"
+    clock.now += 1.0
+    pool.report_throttled(throttled)
+    assert throttled.cooldown_until == pytest.approx(clock.now + 10.0)
+
+    pool.report_success(throttled)
+    assert throttled.strikes == 0
+
+def test_retry_after_overrides_backoff():
+    clock = FakeClock()
+    pool = make_pool(["key-aaaa"], clock)
+    api_key = pool.acquire()
+
+    pool.report_throttled(api_key, retry_after=30.0)
+    pool.acquire()
+
+    assert sum(clock.sleeps) == pytest.approx(31.0)
+    assert pool.stats()[0]['throttled'] == 1
+
+def test_duplicate_keys_are_merged():
+    pool = make_pool(["key-aaaa", "key-bbbb", "key-aaaa"], FakeClock())
+
+    assert len(pool) == 2
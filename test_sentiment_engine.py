@@ -0,0 +1,76 @@
+import datetime
+import pytest
+import pandas as pd
+
+try:
+    from sentiment_engine import SentimentEngine
+    ENGINE = SentimentEngine()
+except LookupError:
+    ENGINE = None
+
+pytestmark = pytest.mark.skipif(ENGINE is None, reason="VADER lexicon not available")
+
+AS_OF = datetime.date(2025, 4, 4)
+HEADLINES = [
+    "record profits beat expectations",
+    "shares plunge after disappointing guidance",
+    "company holds annual meeting",
+    "analysts upgrade stock on strong growth",
+    "regulators open investigation into fraud",
+]
+
+def published(days_ago: int) -> int:
+    """Unix time of noon, days_ago days before AS_OF"""
+    day = AS_OF - datetime.timedelta(days=days_ago)
+    return int(datetime.datetime(day.year, day.month, day.day, 12).timestamp())
+
+def batch_data(max_days_ago: int = 30):
+    """Batch data shaped like FinnhubClient.get_batch_data(), with news spread over max_days_ago days"""
+    data = {}
+    for n, ticker in enumerate(["AAPL", "MSFT", "TSLA"]):
+        news = [
+            {'datetime': published(days_ago), 'headline': HEADLINES[(days_ago + n) % len(HEADLINES)], 'summary': ""}
+            for days_ago in range(n, max_days_ago + 1, n + 2)
+        ]
+        data[ticker] = {
+            'profile': {'name': f"{ticker} Inc.", 'finnhubIndustry': "Technology"},
+            'quote': {'c': 100.0 + n, 'd': 1.0 - n, 'dp': 0.5 * n},
+            'news': news,
+        }
+    data["NONEWS"] = {'profile': {}, 'quote': {}, 'news': []}
+    return data
+
+def within(data, days: int):
+    """Batch data with only the news of the last `days` days, as a fetch with that lookback would return"""
+    return {
+        ticker: dict(ticker_data, news=[item for item in ticker_data['news'] if item['datetime'] >= published(days)])
+        for ticker, ticker_data in data.items()
+    }
+
+@pytest.mark.parametrize("days", [0, 1, 7, 30])
+def test_window_matches_process_batch_data(days):
+    data = batch_data()
+    buckets = ENGINE.build_daily_buckets(data, 30, as_of=AS_OF, fetched_at=0)
+
+    expected = ENGINE.process_batch_data(within(data, days))
+
+    pd.testing.assert_frame_equal(buckets.window(days), expected, check_dtype=False)
+
+def test_subset_and_concat_keep_windows():
+    data = batch_data()
+    buckets = ENGINE.build_daily_buckets(data, 30, as_of=AS_OF, fetched_at=0)
+
+    parts = [buckets.subset(["TSLA", "AAPL"]), buckets.subset(["MSFT", "NONEWS"])]
+    combined = type(buckets).concat(parts).subset(buckets.tickers)
+
+    pd.testing.assert_frame_equal(combined.window(7), buckets.window(7))
+
+def test_buckets_survive_save_and_load(tmp_path):
+    buckets = ENGINE.build_daily_buckets(batch_data(), 30, as_of=AS_OF, fetched_at=0)
+    path = str(tmp_path / "buckets.npz")
+
+    buckets.save(path)
+    loaded = type(buckets).load(path)
+
+    assert loaded.as_of == AS_OF
+    pd.testing.assert_frame_equal(loaded.window(7), buckets.window(7), check_dtype=False)
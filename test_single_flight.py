@@ -0,0 +1,57 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def test_concurrent_calls_for_a_key_run_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        release.wait(5)
+        return {'c': 187.5}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, ('quote', 'AAPL'), fetch) for _ in range(5)]
+        wait_until(lambda: flight.stats()['coalesced'] == 4)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(runs) == 1
+    assert results == [{'c': 187.5}] * 5
+    assert flight.stats() == {'calls': 5, 'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+def test_waiting_callers_share_the_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise RuntimeError("throttled")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(flight.do, 'key', fetch) for _ in range(3)]
+        wait_until(lambda: flight.stats()['coalesced'] == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="throttled"):
+                future.result()
+
+    assert flight.stats()['in_flight'] == 0
+
+def test_sequential_and_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('a', lambda: 2) == 2
+    assert flight.do('b', lambda: 3) == 3
+    assert flight.stats()['executed'] == 3
@@ -0,0 +1,134 @@
+import time
+import pytest
+from ticker_cache import TickerCache
+
+TTLS = {'profile': 3600, 'quote': 60, 'news': 900}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class Upstream:
+    """Counts fetches and answers with the current price"""
+    def __init__(self, price: float = 100.0):
+        self.price = price
+        self.fetches = 0
+
+    def quote(self):
+        self.fetches += 1
+        return {'c': self.price}
+
+def wait_for_refreshes(cache: TickerCache, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while cache.pending_refreshes():
+        assert time.monotonic() < deadline, "background refresh did not finish"
+        time.sleep(0.001)
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return TickerCache(ttls=TTLS, stale_while_revalidate=True, clock=clock)
+
+def test_fresh_entries_are_served_from_cache(cache, clock):
+    upstream = Upstream()
+    cache.get_or_fetch('quote', 'AAPL', (), upstream.quote)
+    clock.now += 59
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 100.0}
+    assert upstream.fetches == 1
+    assert cache.stats()['hits'] == 1
+
+def test_stale_entry_is_served_then_refreshed_in_background(cache, clock):
+    upstream = Upstream()
+    cache.get_or_fetch('quote', 'AAPL', (), upstream.quote)
+    cache.get_or_fetch('quote', 'MSFT', (), upstream.quote)
+    upstream.price = 200.0
+    clock.now += 61
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 100.0}
+    wait_for_refreshes(cache)
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 200.0}
+    assert upstream.fetches == 3
+    # Only the refreshed ticker's data changed
+    assert cache.ticker_versions(['AAPL', 'MSFT']) == {'AAPL': 1, 'MSFT': 0}
+
+def test_failed_refresh_keeps_the_stale_entry(cache, clock):
+    cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 100.0})
+    clock.now += 61
+
+    def fail():
+        raise RuntimeError("throttled")
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), fail) == {'c': 100.0}
+    wait_for_refreshes(cache)
+    assert cache.get_or_fetch('quote', 'AAPL', (), fail) == {'c': 100.0}
+    assert cache.ticker_versions(['AAPL']) == {'AAPL': 0}
+
+def test_invalidation_is_limited_to_tickers_and_endpoints(cache):
+    upstream = Upstream()
+    for ticker in ('AAPL', 'MSFT'):
+        cache.get_or_fetch('quote', ticker, (), upstream.quote)
+        cache.get_or_fetch('profile', ticker, (), lambda: {'name': ticker})
+
+    assert cache.invalidate(['AAPL'], endpoints=['quote']) == 1
+    upstream.price = 200.0
+
+    # Marked stale: served once more while it refreshes
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 100.0}
+    wait_for_refreshes(cache)
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 200.0}
+    assert cache.get_or_fetch('quote', 'MSFT', (), upstream.quote) == {'c': 100.0}
+    assert cache.stats()['stale_hits'] == 1
+
+def test_hard_invalidation_refetches_synchronously(cache):
+    upstream = Upstream()
+    cache.get_or_fetch('quote', 'AAPL', (), upstream.quote)
+    upstream.price = 200.0
+
+    cache.invalidate(['AAPL'], endpoints=['quote'], hard=True)
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), upstream.quote) == {'c': 200.0}
+    assert cache.pending_refreshes() == 0
+
+def test_stale_only_drops_just_the_stale_entries(cache, clock):
+    cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 100.0})
+    cache.get_or_fetch('profile', 'AAPL', (), lambda: {'name': "Apple"})
+    clock.now += 61
+
+    assert cache.invalidate(['AAPL'], hard=True, stale_only=True) == 1
+    assert cache.stats()['entries'] == 1
+    assert cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 200.0}) == {'c': 200.0}
+
+def test_without_stale_while_revalidate_stale_entries_are_refetched(clock):
+    cache = TickerCache(ttls=TTLS, stale_while_revalidate=False, clock=clock)
+    cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 100.0})
+    clock.now += 61
+
+    assert cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 200.0}) == {'c': 200.0}
+
+def test_ttl_policy_overrides_endpoint_ttl(cache, clock):
+    cache.set_ttl_policy('news', lambda ticker: float('inf') if ticker == 'AAPL' else None)
+    cache.get_or_fetch('news', 'AAPL', ('2025-03-05', '2025-04-04'), lambda: ['old'])
+    cache.get_or_fetch('news', 'MSFT', ('2025-03-05', '2025-04-04'), lambda: ['old'])
+    clock.now += 901
+
+    cache.invalidate(hard=True, stale_only=True)
+
+    assert cache.get_or_fetch('news', 'AAPL', ('2025-03-05', '2025-04-04'), lambda: ['new']) == ['old']
+    assert cache.get_or_fetch('news', 'MSFT', ('2025-03-05', '2025-04-04'), lambda: ['new']) == ['new']
+
+def test_listeners_only_see_fetched_responses(cache):
+    seen = []
+    cache.subscribe(lambda endpoint, ticker, params, value: seen.append((endpoint, ticker, value)))
+
+    cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 100.0})
+    cache.get_or_fetch('quote', 'AAPL', (), lambda: {'c': 200.0})
+
+    assert seen == [('quote', 'AAPL', {'c': 100.0})]
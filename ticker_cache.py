@@ -0,0 +1,242 @@
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+from config import (
+    CACHE_TTL_SECONDS,
+    CACHE_MAX_ENTRIES,
+    STALE_WHILE_REVALIDATE,
+    CACHE_REFRESH_WORKERS,
+)
+
+# Set up a logger
+logger = logging.getLogger('ticker_cache')
+
+# Cache key: (endpoint, ticker, request parameters)
+CacheKey = Tuple[str, str, Tuple]
+
+class CacheEntry:
+    def __init__(self, value: Any, fetched_at: float):
+        """A cached response and the time it was fetched"""
+        self.value = value
+        self.fetched_at = fetched_at
+        self.invalidated = False
+
+class TickerCache:
+    def __init__(
+        self,
+        ttls: Dict[str, float] = CACHE_TTL_SECONDS,
+        stale_while_revalidate: bool = STALE_WHILE_REVALIDATE,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        refresh_workers: int = CACHE_REFRESH_WORKERS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize a cache of Finnhub responses keyed by endpoint and ticker
+
+        Args:
+            ttls: Lifetime in seconds of entries for each endpoint
+            stale_while_revalidate: Serve stale entries and refresh them in the background
+            max_entries: Number of entries kept before the oldest are evicted
+            refresh_workers: Threads used for background refreshes
+            clock: Wall clock, injectable for testing
+        """
+        self.ttls = ttls
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[CacheKey, CacheEntry] = {}
+        self._refreshing = set()
+        self._listeners: List[Callable[[str, str, Tuple, Any], None]] = []
+        self._ttl_policies: Dict[str, Callable[[str], Optional[float]]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='cache-refresh')
+        self.version = 0  # bumped whenever a background refresh stores new data
+        self._versions: Dict[str, int] = {}  # ticker -> version of its latest background refresh
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def ttl(self, endpoint: str, ticker: str) -> float:
+        """Lifetime in seconds of a ticker's entries for an endpoint"""
+        policy = self._ttl_policies.get(endpoint)
+        ttl = policy(ticker) if policy is not None else None
+        return self.ttls.get(endpoint, 0) if ttl is None else ttl
+
+    def set_ttl_policy(self, endpoint: str, policy: Callable[[str], Optional[float]]):
+        """
+        Let a function decide the lifetime of an endpoint's entries per ticker
+
+        Args:
+            endpoint: Endpoint name (profile, quote, news)
+            policy: Function taking a ticker and returning its entries' lifetime in
+                seconds, or None for the endpoint's TTL; it is called under the
+                cache's lock, so it must not call back into the cache
+        """
+        with self._lock:
+            self._ttl_policies[endpoint] = policy
+
+    def is_stale(self, key: CacheKey, entry: CacheEntry) -> bool:
+        """Check whether an entry has been invalidated or outlived its TTL"""
+        return entry.invalidated or self.clock() - entry.fetched_at > self.ttl(key[0], key[1])
+
+    def get_or_fetch(self, endpoint: str, ticker: str, params: Tuple, fetch: Callable[[], Any]) -> Any:
+        """
+        Get a cached response, fetching it if missing or stale
+
+        With stale-while-revalidate enabled, a stale entry is returned immediately
+        and refreshed in the background. Exceptions raised by fetch are not cached.
+
+        Args:
+            endpoint: Endpoint name (profile, quote, news)
+            ticker: Stock symbol
+            params: Remaining request parameters that identify the response
+            fetch: Function performing the request
+
+        Returns:
+            The cached or freshly fetched response
+        """
+        key = (endpoint, ticker, params)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self.is_stale(key, entry):
+                self.hits += 1
+                return entry.value
+            if entry is not None and self.stale_while_revalidate:
+                self.stale_hits += 1
+                self._schedule_refresh(key, fetch)
+                return entry.value
+            self.misses += 1
+
+        value = fetch()
+        self._store(key, value)
+        return value
+
+    def _schedule_refresh(self, key: CacheKey, fetch: Callable[[], Any]):
+        """Refresh an entry in the background (caller holds the lock)"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key: CacheKey, fetch: Callable[[], Any]):
+        """Background refresh task; keeps the stale entry if the fetch fails"""
+        try:
+            value = fetch()
+        except Exception as e:
+            logger.error(f"Background refresh of {key} failed: {e}")
+        else:
+            self._store(key, value)
+            with self._lock:
+                self.version += 1
+                self._versions[key[1]] = self.version
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def subscribe(self, listener: Callable[[str, str, Tuple, Any], None]):
+        """
+        Call a function with every freshly fetched response (never with cache hits)
+
+        Args:
+            listener: Function taking (endpoint, ticker, params, response); it runs in
+                the fetching thread, so it should be quick
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _store(self, key: CacheKey, value: Any):
+        """Store a response, evicting the oldest entries when over capacity"""
+        with self._lock:
+            self._entries[key] = CacheEntry(value, self.clock())
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                oldest = sorted(self._entries, key=lambda k: self._entries[k].fetched_at)[:overflow]
+                for old_key in oldest:
+                    del self._entries[old_key]
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(*key, value)
+            except Exception as e:
+                logger.error(f"Cache listener failed for {key}: {e}")
+
+    def invalidate(
+        self,
+        tickers: Optional[Iterable[str]] = None,
+        endpoints: Optional[Iterable[str]] = None,
+        hard: bool = False,
+        stale_only: bool = False,
+    ) -> int:
+        """
+        Invalidate entries for some tickers and endpoints
+
+        Args:
+            tickers: Tickers to invalidate (None for all)
+            endpoints: Endpoints to invalidate (None for all)
+            hard: Drop the entries instead of marking them stale; dropped entries
+                are refetched synchronously instead of served stale
+            stale_only: Only invalidate entries that are already stale (with hard=True,
+                the next read refetches them instead of serving the stale copy)
+
+        Returns:
+            Number of entries invalidated
+        """
+        tickers = None if tickers is None else set(tickers)
+        endpoints = None if endpoints is None else set(endpoints)
+
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (tickers is None or key[1] in tickers) and (endpoints is None or key[0] in endpoints)
+                and (not stale_only or self.is_stale(key, self._entries[key]))
+            ]
+            for key in keys:
+                if hard:
+                    del self._entries[key]
+                else:
+                    self._entries[key].invalidated = True
+
+        logger.info(f"Invalidated {len(keys)} cache entries")
+        return len(keys)
+
+    def ticker_versions(self, tickers: Iterable[str]) -> Dict[str, int]:
+        """
+        Get the version of each ticker's data, which changes whenever a background refresh stores new data for it
+
+        Args:
+            tickers: Stock symbols
+
+        Returns:
+            Dictionary of version per ticker (0 if never refreshed in the background)
+        """
+        with self._lock:
+            return {ticker: self._versions.get(ticker, 0) for ticker in tickers}
+
+    def pending_refreshes(self) -> int:
+        """Number of background refreshes in progress"""
+        with self._lock:
+            return len(self._refreshing)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with entry count, hits, stale hits, misses and pending refreshes
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshing': len(self._refreshing),
+                'version': self.version,
+            }
+
+# Process-wide cache shared by every FinnhubClient (and so every dashboard session)
+shared_cache = TickerCache()